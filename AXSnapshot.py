@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+from typing import Any, Dict, List, Optional, Tuple
+
+# 没有名字时不输出、只把子节点上提的"结构性"角色
+TRANSPARENT_ROLES = {'generic', 'none', 'presentation', 'InlineTextBox', 'LineBreak', 'group', 'Section', 'paragraph'}
+# 可以交互、值得分配 element_id 的角色
+INTERACTIVE_ROLES = {
+    'button', 'link', 'textbox', 'searchbox', 'combobox', 'checkbox', 'radio', 'switch',
+    'menuitem', 'menuitemcheckbox', 'menuitemradio', 'option', 'tab', 'slider', 'spinbutton',
+    'listbox', 'treeitem', 'image', 'img',
+}
+# 需要附带在输出中的状态属性
+STATE_PROPERTIES = {'checked', 'selected', 'expanded', 'disabled', 'required', 'focused', 'pressed', 'level'}
+
+
+def _ax_value(field: Optional[Dict[str, Any]]) -> Any:
+    return field.get('value') if field else None
+
+
+def prune_ax_tree(
+    nodes: List[Dict[str, Any]],
+    max_depth: int = 30,
+    max_nodes: int = 500,
+    id_prefix: str = 'ax-',
+    indent: str = '  ',
+) -> Tuple[List[str], Dict[str, int], Dict[str, Any]]:
+    """
+    将 Accessibility.getFullAXTree 返回的节点列表裁剪为紧凑的缩进大纲。
+
+    返回 (大纲行, {element_id: backendDOMNodeId}, 统计信息), 可交互节点以 [element_id] 开头。
+    被忽略的节点和无名的结构性节点不输出, 其子节点上提一层; 与父节点名字相同的纯文本节点也会被省略。
+    """
+    by_id = {node['nodeId']: node for node in nodes}
+    roots = [node for node in nodes if not node.get('parentId') or node['parentId'] not in by_id]
+
+    lines: List[str] = []
+    handles: Dict[str, int] = {}
+    stats = {"total_nodes": len(nodes), "emitted_nodes": 0, "truncated": False}
+
+    def walk(node: Dict[str, Any], depth: int, parent_name: str):
+        if stats["emitted_nodes"] >= max_nodes:
+            stats["truncated"] = True
+            return
+        role = _ax_value(node.get('role')) or ''
+        name = (_ax_value(node.get('name')) or '').strip()
+        emit = not node.get('ignored') and not (role in TRANSPARENT_ROLES and not name)
+        if role in ('StaticText', 'text') and name == parent_name:
+            emit = False
+
+        child_depth = depth
+        if emit:
+            if depth >= max_depth:
+                stats["truncated"] = True
+                return
+            parts = [role]
+            backend_id = node.get('backendDOMNodeId')
+            if backend_id and role in INTERACTIVE_ROLES:
+                handle = f"{id_prefix}{backend_id}"
+                handles[handle] = backend_id
+                parts.insert(0, f"[{handle}]")
+            if name:
+                parts.append(f'"{name[:120]}"')
+            value = _ax_value(node.get('value'))
+            if value not in (None, ''):
+                parts.append(f'value="{str(value)[:80]}"')
+            for prop in node.get('properties', []):
+                prop_value = _ax_value(prop.get('value'))
+                if prop.get('name') in STATE_PROPERTIES and prop_value not in (None, False, 'false'):
+                    parts.append(f"{prop['name']}={prop_value}" if prop_value is not True else prop['name'])
+            lines.append(f"{indent * depth}{' '.join(parts)}")
+            stats["emitted_nodes"] += 1
+            child_depth = depth + 1
+            parent_name = name
+
+        for child_id in node.get('childIds', []):
+            child = by_id.get(child_id)
+            if child:
+                walk(child, child_depth, parent_name)
+
+    for root in roots:
+        walk(root, 0, '')
+    return lines, handles, stats
@@ -82,4 +82,309 @@ const domJson = buildDomJsonTree();
 return JSON.stringify(domJson);
 
 
-'''
\ No newline at end of file
+'''
+
+# 页内定位索引: 在每个 frame 的 window 上安装一次, 之后通过 MutationObserver 增量更新,
+# 覆盖文档本身以及所有已打开的 shadow root。
+# 参数: arguments[0] = 'css' | 'text' | 'accurate', arguments[1] = 值, arguments[2] = 最多返回数量
+locatorIndex = '''
+const [by, value, limit] = arguments;
+
+function ownText(el) {
+  let text = '';
+  for (const child of el.childNodes) {
+    if (child.nodeType === Node.TEXT_NODE) text += child.nodeValue;
+  }
+  return text.replace(/\\s+/g, ' ').trim();
+}
+
+function install() {
+  const idx = {
+    version: 0,
+    entries: new Map(),   // element -> 该元素注册过的索引键
+    keys: new Map(),      // 'tag:div' / 'id:x' / 'class:y' / 'role:z' / 'text:...' -> Set(element)
+    roots: new Set([document]),
+    // 待同步的变更, 在观察器回调中就地合并, 不保留 MutationRecord 本身
+    dirtyTrees: new Set(),  // 新增的子树根节点, 同步时整棵索引
+    dirtyNodes: new Set(),  // 属性或文本变化的元素, 同步时只重建自身
+    overflow: false,        // 待同步变更过多时改为同步时整体重建, 保证内存有上限
+    // 自定义元素 (标签名含 '-'): 可能在建立索引之后才 attachShadow, 而 attachShadow 不产生变更记录
+    hosts: new Set(),
+  };
+  const MAX_DIRTY = 5000;
+
+  const link = (key, el) => {
+    if (!idx.keys.has(key)) idx.keys.set(key, new Set());
+    idx.keys.get(key).add(el);
+  };
+
+  idx.forget = (el) => {
+    const keys = idx.entries.get(el);
+    if (!keys) return;
+    for (const key of keys) {
+      const set = idx.keys.get(key);
+      if (set) { set.delete(el); if (!set.size) idx.keys.delete(key); }
+    }
+    idx.entries.delete(el);
+    idx.hosts.delete(el);
+  };
+
+  idx.index = (el) => {
+    idx.forget(el);
+    const keys = ['tag:' + el.localName];
+    if (el.id) keys.push('id:' + el.id);
+    for (const cls of el.classList || []) keys.push('class:' + cls);
+    const role = el.getAttribute('role');
+    if (role) keys.push('role:' + role);
+    const text = ownText(el);
+    if (text) keys.push('text:' + text);
+    keys.forEach(key => link(key, el));
+    idx.entries.set(el, keys);
+    if (el.localName.includes('-') && !el.shadowRoot) idx.hosts.add(el);
+  };
+
+  const markDirty = (set, node) => {
+    if (idx.overflow) return;
+    set.add(node);
+    if (idx.dirtyTrees.size + idx.dirtyNodes.size > MAX_DIRTY) {
+      idx.overflow = true;
+      idx.dirtyTrees.clear();
+      idx.dirtyNodes.clear();
+    }
+  };
+
+  const onMutations = (records) => {
+    for (const rec of records) {
+      if (rec.type === 'childList') {
+        // 移除的节点立即从索引中删除, 不再持有已脱离文档的节点
+        rec.removedNodes.forEach(node => {
+          idx.dirtyTrees.delete(node);
+          idx.dirtyNodes.delete(node);
+          idx.remove(node);
+        });
+        rec.addedNodes.forEach(node => { if (node.nodeType === Node.ELEMENT_NODE) markDirty(idx.dirtyTrees, node); });
+        if (rec.target.nodeType === Node.ELEMENT_NODE) markDirty(idx.dirtyNodes, rec.target);
+      } else if (rec.type === 'characterData') {
+        if (rec.target.parentElement) markDirty(idx.dirtyNodes, rec.target.parentElement);
+      } else {
+        markDirty(idx.dirtyNodes, rec.target);
+      }
+    }
+    idx.version++;
+  };
+  idx.observer = new MutationObserver(onMutations);
+  const observe = (root) => idx.observer.observe(root, {
+    childList: true, subtree: true, characterData: true,
+    attributes: true, attributeFilter: ['id', 'class', 'role'],
+  });
+
+  idx.add = (root) => {
+    const walk = (node) => {
+      if (node.nodeType === Node.ELEMENT_NODE) {
+        idx.index(node);
+        if (node.shadowRoot) {
+          if (!idx.roots.has(node.shadowRoot)) {
+            idx.roots.add(node.shadowRoot);
+            observe(node.shadowRoot);
+          }
+          walk(node.shadowRoot);
+        }
+      }
+      for (const child of node.children || []) walk(child);
+    };
+    walk(root);
+  };
+
+  idx.remove = (root) => {
+    if (root.nodeType !== Node.ELEMENT_NODE) return;
+    idx.forget(root);
+    for (const el of root.querySelectorAll('*')) idx.forget(el);
+  };
+
+  idx.sync = () => {
+    const pending = idx.observer.takeRecords();
+    if (pending.length) onMutations(pending);
+    if (idx.overflow) {
+      idx.entries.clear();
+      idx.keys.clear();
+      idx.hosts.clear();
+      idx.add(document.documentElement);
+      idx.overflow = false;
+    } else {
+      for (const node of idx.dirtyTrees) { if (node.isConnected) idx.add(node); }
+      for (const el of idx.dirtyNodes) { if (el.isConnected && idx.entries.has(el)) idx.index(el); }
+    }
+    idx.dirtyTrees.clear();
+    idx.dirtyNodes.clear();
+    // 建立索引后才挂上的 shadow root
+    for (const host of idx.hosts) {
+      if (host.shadowRoot) { idx.hosts.delete(host); if (host.isConnected) idx.add(host); }
+    }
+    for (const root of idx.roots) {
+      if (root !== document && !root.host.isConnected) idx.roots.delete(root);
+    }
+  };
+
+  observe(document);
+  idx.add(document.documentElement);
+  return idx;
+}
+
+if (!window.__dpLocatorIndex) window.__dpLocatorIndex = install();
+const idx = window.__dpLocatorIndex;
+idx.sync();
+
+const results = new Set();
+const fromKey = (key) => (idx.keys.get(key) || []).forEach(el => results.add(el));
+
+if (by === 'accurate') {
+  fromKey('text:' + value.replace(/\\s+/g, ' ').trim());
+} else if (by === 'text') {
+  for (const [key, set] of idx.keys) {
+    if (key.startsWith('text:') && key.includes(value)) set.forEach(el => results.add(el));
+  }
+} else {
+  // 简单选择器直接查索引, 复杂选择器在文档和所有 shadow root 中分别查询
+  const simple = value.match(/^(?:#([\\w-]+)|\\.([\\w-]+)|([a-zA-Z][\\w-]*)|\\[role=["']?([\\w-]+)["']?\\])$/);
+  if (simple) {
+    const [, id, cls, tag, role] = simple;
+    fromKey(id ? 'id:' + id : cls ? 'class:' + cls : tag ? 'tag:' + tag.toLowerCase() : 'role:' + role);
+  } else {
+    for (const root of idx.roots) root.querySelectorAll(value).forEach(el => results.add(el));
+  }
+}
+
+return Array.from(results)
+  .filter(el => el.isConnected)
+  .sort((a, b) => (a.compareDocumentPosition(b) & Node.DOCUMENT_POSITION_FOLLOWING) ? -1 : 1)
+  .slice(0, limit);
+'''
+
+
+# 批量填写/校验表单字段: 通过原生 value setter 赋值并派发 input/change 事件, 一次调用处理同一 frame 内的所有字段。
+# 参数: arguments[0] = 值列表, arguments[1] = 'set' | 'verify', 其余参数为对应的元素
+fillFields = '''
+const [values, mode, ...elements] = arguments;
+const truthy = (v) => v === true || ['true', '1', 'on', 'yes', 'checked'].includes(String(v).toLowerCase());
+
+function setValue(el, value) {
+  if (el.isContentEditable) {
+    el.focus();
+    document.execCommand('selectAll', false, null);
+    document.execCommand('insertText', false, String(value));
+    return;
+  }
+  if (el.type === 'checkbox' || el.type === 'radio') {
+    if (el.checked !== truthy(value)) el.click();
+    return;
+  }
+  if (el instanceof HTMLSelectElement && ![...el.options].some(o => o.value === String(value))) {
+    const option = [...el.options].find(o => o.text.trim() === String(value));
+    if (option) value = option.value;
+  }
+  const proto = el instanceof HTMLTextAreaElement ? HTMLTextAreaElement.prototype
+    : el instanceof HTMLSelectElement ? HTMLSelectElement.prototype : HTMLInputElement.prototype;
+  Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, String(value));
+  el.dispatchEvent(new Event('input', { bubbles: true }));
+  el.dispatchEvent(new Event('change', { bubbles: true }));
+}
+
+function check(el, value) {
+  if (el.isContentEditable) {
+    const actual = el.innerText.trim();
+    return { actual, ok: actual === String(value).trim() };
+  }
+  if (el.type === 'checkbox' || el.type === 'radio') {
+    return { actual: el.checked, ok: el.checked === truthy(value) };
+  }
+  if (el instanceof HTMLSelectElement) {
+    const text = el.selectedOptions[0] ? el.selectedOptions[0].text.trim() : '';
+    return { actual: el.value, ok: el.value === String(value) || text === String(value) };
+  }
+  return { actual: el.value, ok: el.value === String(value) };
+}
+
+return elements.map((el, i) => {
+  if (mode === 'set') {
+    try { setValue(el, values[i]); } catch (e) { return { actual: null, ok: false, error: String(e) }; }
+  }
+  return check(el, values[i]);
+});
+'''
+
+
+# 导出当前 origin 的 localStorage / sessionStorage / IndexedDB (值需可 JSON 序列化)。
+storageSnapshot = '''
+return (async () => {
+  const dump = (storage) => Object.fromEntries(Object.keys(storage).map(k => [k, storage.getItem(k)]));
+  const request = (req) => new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+
+  const databases = [];
+  for (const info of (indexedDB.databases ? await indexedDB.databases() : [])) {
+    const db = await request(indexedDB.open(info.name));
+    const stores = [];
+    for (const storeName of db.objectStoreNames) {
+      const store = db.transaction(storeName, 'readonly').objectStore(storeName);
+      const [keys, values] = await Promise.all([request(store.getAllKeys()), request(store.getAll())]);
+      stores.push({
+        name: storeName,
+        keyPath: store.keyPath,
+        autoIncrement: store.autoIncrement,
+        indexes: [...store.indexNames].map(n => {
+          const index = store.index(n);
+          return { name: n, keyPath: index.keyPath, unique: index.unique, multiEntry: index.multiEntry };
+        }),
+        records: keys.map((key, i) => [key, values[i]]),
+      });
+    }
+    databases.push({ name: info.name, version: db.version, stores });
+    db.close();
+  }
+  return JSON.stringify({
+    origin: location.origin,
+    localStorage: dump(localStorage),
+    sessionStorage: dump(sessionStorage),
+    indexedDB: databases,
+  });
+})();
+'''
+
+# 把 storageSnapshot 导出的 localStorage / IndexedDB 写回当前 origin。参数: arguments[0] = 导出的 JSON 字符串
+storageRestore = '''
+return (async () => {
+  const state = JSON.parse(arguments[0]);
+  const request = (req) => new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+
+  for (const [k, v] of Object.entries(state.localStorage || {})) localStorage.setItem(k, v);
+
+  let records = 0;
+  for (const dbState of state.indexedDB || []) {
+    await request(indexedDB.deleteDatabase(dbState.name));
+    const open = indexedDB.open(dbState.name, dbState.version);
+    open.onupgradeneeded = () => {
+      for (const s of dbState.stores) {
+        const options = { autoIncrement: s.autoIncrement };
+        if (s.keyPath !== null) options.keyPath = s.keyPath;
+        const store = open.result.createObjectStore(s.name, options);
+        s.indexes.forEach(i => store.createIndex(i.name, i.keyPath, { unique: i.unique, multiEntry: i.multiEntry }));
+      }
+    };
+    const db = await request(open);
+    for (const s of dbState.stores) {
+      const tx = db.transaction(s.name, 'readwrite');
+      const store = tx.objectStore(s.name);
+      s.records.forEach(([key, value]) => s.keyPath === null ? store.put(value, key) : store.put(value));
+      records += s.records.length;
+      await new Promise((resolve, reject) => { tx.oncomplete = resolve; tx.onerror = () => reject(tx.error); });
+    }
+    db.close();
+  }
+  return records;
+})();
+'''
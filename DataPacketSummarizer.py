@@ -1,5 +1,54 @@
 
-from typing import Any,List, Dict
+import re
+from collections import Counter, OrderedDict
+from typing import Any, List, Dict
+from urllib.parse import urlsplit, parse_qsl
+
+# URL 路径中会变化的片段, 按顺序匹配, 替换为占位符
+VOLATILE_SEGMENTS = [
+    (re.compile(r'^\d+$'), '{id}'),
+    (re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$'), '{uuid}'),
+    (re.compile(r'^[0-9a-fA-F]{16,}$'), '{hash}'),
+    (re.compile(r'^(?=.*\d)[A-Za-z0-9_\-]{20,}$'), '{token}'),
+]
+# 缓存破坏、回调名、签名等每次请求都不同的查询参数, 生成模板时直接去掉
+VOLATILE_QUERY_PARAMS = {'_', 't', 'ts', '_t', 'timestamp', 'time', 'rand', 'random', 'r', 'nonce',
+                         'callback', 'jsonp', 'cb', 'sign', 'signature', 'w_rid', 'wts', 'dm_img_str',
+                         'dm_cover_img_str', 'dm_img_list', 'web_location'}
+
+
+def normalize_url(url: str) -> str:
+    """
+    把 URL 归一化为端点模板, 例如
+    'https://api.x.com/user/12345/posts?page=2&_=1718000000' -> 'https://api.x.com/user/{id}/posts?page={n}'
+    """
+    parts = urlsplit(url)
+    segments = []
+    for segment in parts.path.split('/'):
+        for pattern, placeholder in VOLATILE_SEGMENTS:
+            if pattern.match(segment):
+                segment = placeholder
+                break
+        segments.append(segment)
+    params = []
+    for key, value in sorted(parse_qsl(parts.query, keep_blank_values=True)):
+        if key.lower() in VOLATILE_QUERY_PARAMS:
+            continue
+        if re.fullmatch(r'-?\d+(\.\d+)?', value):
+            value = '{n}'
+        elif any(p.match(value) for p, _ in VOLATILE_SEGMENTS[1:]):
+            value = '{token}'
+        params.append(f"{key}={value}")
+    template = f"{parts.scheme}://{parts.netloc}{'/'.join(segments)}"
+    return f"{template}?{'&'.join(params)}" if params else template
+
+
+def _percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return round(ordered[low] + (ordered[high] - ordered[low]) * (k - low), 1)
 
 
 class DataPacketSummarizer:
@@ -62,3 +111,116 @@ class DataPacketSummarizer:
     def summarize_packets(self, packets: List[Any]) -> List[Dict[str, Any]]:
         """对一整个数据包列表生成摘要"""
         return [self.summarize_packet(p) for p in packets]
+
+    # --- 按端点聚合 ---
+
+    def infer_schema(self, data: Any, max_depth: int = 4, current_depth: int = 0, list_samples: int = 3) -> Any:
+        """
+        推断 JSON 的类型结构: 基础类型只保留类型名, 列表合并前 list_samples 个元素的结构。
+        """
+        if isinstance(data, dict):
+            if current_depth >= max_depth:
+                return "object"
+            return {k: self.infer_schema(v, max_depth, current_depth + 1, list_samples) for k, v in data.items()}
+        if isinstance(data, list):
+            if current_depth >= max_depth:
+                return "list"
+            if not data:
+                # 空列表 (如翻页的最后一页) 没有元素结构, 合并时保留其他响应推断出的元素结构
+                return {"type": "list", "item_schema": None}
+            item_schema = None
+            for item in data[:list_samples]:
+                item_schema = self.merge_schemas(item_schema, self.infer_schema(item, max_depth, current_depth + 1, list_samples))
+            return {"type": "list", "item_schema": item_schema}
+        if data is None:
+            return "null"
+        return type(data).__name__
+
+    def merge_schemas(self, a: Any, b: Any) -> Any:
+        """
+        合并两份结构: 字段取并集, 只在部分响应中出现的字段名加 '?' 后缀, 类型不同时用 '|' 连接。
+        """
+        if a is None:
+            return b
+        if b is None:
+            return a
+        a_is_list = isinstance(a, dict) and a.get("type") == "list" and "item_schema" in a
+        b_is_list = isinstance(b, dict) and b.get("type") == "list" and "item_schema" in b
+        if a_is_list and b_is_list:
+            return {"type": "list", "item_schema": self.merge_schemas(a["item_schema"], b["item_schema"])}
+        if isinstance(a, dict) and isinstance(b, dict) and not a_is_list and not b_is_list:
+            a_fields = {k.rstrip('?'): (k.endswith('?'), v) for k, v in a.items()}
+            b_fields = {k.rstrip('?'): (k.endswith('?'), v) for k, v in b.items()}
+            merged = {}
+            for key in OrderedDict.fromkeys([*a_fields, *b_fields]):
+                a_optional, a_value = a_fields.get(key, (True, None))
+                b_optional, b_value = b_fields.get(key, (True, None))
+                merged[key + ('?' if a_optional or b_optional else '')] = self.merge_schemas(a_value, b_value)
+            return merged
+        if a == b:
+            return a
+        # 同一字段有时为 null、有时为对象/列表时保留结构; 超出深度的列表 ("list") 同样不覆盖已知的元素结构
+        if a == "null" and isinstance(b, dict) or a == "list" and b_is_list:
+            return b
+        if b == "null" and isinstance(a, dict) or b == "list" and a_is_list:
+            return a
+        names = lambda s: s.split('|') if isinstance(s, str) else ["list" if s.get("type") == "list" else "object"]
+        return '|'.join(OrderedDict.fromkeys(names(a) + names(b)))
+
+    def summarize_groups(self, packets: List[Any], max_schema_samples: int = 5) -> List[Dict[str, Any]]:
+        """
+        把数据包按 "方法 + URL 模板" 分组, 每组只输出一次合并后的响应结构,
+        并统计请求数、状态码分布和耗时 (响应头到达时间) 百分位。轮询、翻页产生的大量相似请求会合并为一条。
+        每组只取前 max_schema_samples 个 JSON 响应推断结构, 其余响应体不再解析。
+        """
+        groups: Dict[tuple, Dict[str, Any]] = OrderedDict()
+        for packet in packets:
+            key = (packet.method, normalize_url(packet.url))
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = {"method": key[0], "url_template": key[1], "example_url": packet.url,
+                                       "count": 0, "status": Counter(), "timings": [], "errors": Counter(),
+                                       "mime_types": Counter(), "schema": None, "schema_samples": 0,
+                                       "body_bytes": []}
+            group["count"] += 1
+            response = packet.response
+            group["status"][str(response.status) if response else "Failed"] += 1
+            if packet.fail_info:
+                group["errors"][packet.fail_info.errorText] += 1
+            if not response:
+                continue
+            timing = response.timing or {}
+            if timing.get('receiveHeadersEnd') is not None:
+                group["timings"].append(timing['receiveHeadersEnd'])
+            mime_type = response.mimeType or ""
+            group["mime_types"][mime_type] += 1
+            body = response.body
+            if "json" in mime_type and isinstance(body, (dict, list)):
+                if group["schema_samples"] < max_schema_samples:
+                    group["schema"] = self.merge_schemas(group["schema"], self.infer_schema(body))
+                    group["schema_samples"] += 1
+            elif body is not None:
+                group["body_bytes"].append(len(body) if isinstance(body, (bytes, str)) else len(str(body)))
+
+        summaries = []
+        for group in groups.values():
+            summary = {
+                "method": group["method"],
+                "url_template": group["url_template"],
+                "example_url": group["example_url"],
+                "count": group["count"],
+                "status": dict(group["status"]),
+                "mime_type": group["mime_types"].most_common(1)[0][0] if group["mime_types"] else None,
+            }
+            if group["timings"]:
+                summary["timing_ms"] = {"p50": _percentile(group["timings"], 50), "p95": _percentile(group["timings"], 95),
+                                        "max": round(max(group["timings"]), 1)}
+            if group["errors"]:
+                summary["errors"] = dict(group["errors"])
+            if group["schema"] is not None:
+                summary["response_schema"] = group["schema"]
+            elif group["body_bytes"]:
+                summary["response_schema"] = f"Non-JSON body, avg {sum(group['body_bytes']) // len(group['body_bytes'])} bytes"
+            summaries.append(summary)
+        summaries.sort(key=lambda s: s["count"], reverse=True)
+        return summaries
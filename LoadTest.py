@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+"""
+多客户端并发压测: 启动 MCP 服务器, 用 N 个模拟客户端按脚本化的工具组合访问本地 fixtures 站点 (无头 Chromium),
+报告吞吐量、每个工具的 p50/p95/p99 延迟, 以及服务器进程树 (含浏览器) 的内存增长, 结果保存为 JSON 供回归对比。
+
+    python LoadTest.py --clients 4 --iterations 20 --mix read
+    python LoadTest.py --transport streamable-http --clients 8 --baseline LoadTests/上一次.json
+
+stdio: 每个客户端启动一个独立的服务器进程和浏览器 (调试端口依次递增)
+streamable-http: 启动一个服务器进程, 所有客户端共享一个浏览器, 每个会话使用独立的标签页
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import threading
+import subprocess
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from ToolBox import serve_directory
+from Watchdog import process_rss_mb, psutil
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 工具组合: 每轮按顺序执行一遍; 参数中的 {base} 替换为 fixtures 站点地址, {tab} 替换为客户端的标签页ID
+MIXES: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {
+    'read': [
+        ('get', {'url': '{base}/publications.html', 'tab_id': '{tab}'}),
+        ('get_visible_text', {'tab_id': '{tab}'}),
+        ('find_elements', {'tab_id': '{tab}', 'by': 'css', 'value': 'li.paper-item', 'limit': 20}),
+        ('run_javascript', {'tab_id': '{tab}', 'js_script': "return document.querySelectorAll('a').length"}),
+        ('list_tabs', {}),
+    ],
+    'dom': [
+        ('get', {'url': '{base}/publications.html', 'tab_id': '{tab}'}),
+        ('get_domTreeToJson', {'tab_id': '{tab}'}),
+        ('get_ax_snapshot', {'tab_id': '{tab}', 'max_nodes': 200}),
+        ('find_element', {'tab_id': '{tab}', 'by': 'css', 'value': '#q'}),
+    ],
+    'form': [
+        ('get', {'url': '{base}/form50.html', 'tab_id': '{tab}'}),
+        # form50.html 中 id 个位为 8 的字段是下拉框, 只有 '' / 'a' / 'b' 三个选项
+        ('fill_form', {'tab_id': '{tab}', 'fields': {f'#f{i}': 'b' if i % 10 == 8 else f'value {i}' for i in range(0, 20, 2)}}),
+        ('run_javascript', {'tab_id': '{tab}', 'js_script': "return document.querySelector('#f0').value"}),
+    ],
+}
+
+
+def percentile(values: List[float], p: float) -> float:
+    """线性插值百分位数, p 取 0~100。"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = (len(ordered) - 1) * p / 100
+    low = int(k)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def _children_map() -> Dict[int, List[int]]:
+    """ppid -> [pid], 没有 psutil 时读取 /proc。"""
+    children = defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", 'r') as f:
+                # comm 字段可能包含空格, 从最后一个 ')' 之后开始解析
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children[ppid].append(int(entry))
+    return children
+
+
+def descendant_pids(root_pid: int) -> List[int]:
+    """root_pid 的所有子孙进程 (不含自身), 即服务器进程及其启动的浏览器。"""
+    if psutil:
+        return [p.pid for p in psutil.Process(root_pid).children(recursive=True)]
+    children, pids, stack = _children_map(), [], [root_pid]
+    while stack:
+        for child in children.get(stack.pop(), []):
+            pids.append(child)
+            stack.append(child)
+    return pids
+
+
+class RssSampler:
+    """
+    后台线程按固定间隔采样压测进程所有子孙进程的内存之和。
+    见过的进程会一直计入: stdio 服务器退出后浏览器被过继给 init, 不再是子孙进程, 但直到被关闭前仍占用内存。
+    """
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.samples: List[Tuple[float, float]] = []
+        self.pids: set = set()
+        self._stop = threading.Event()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while True:
+            self.pids.update(descendant_pids(os.getpid()))
+            total = sum(rss for rss in map(process_rss_mb, self.pids) if rss is not None)
+            self.samples.append((round(time.perf_counter() - self._start, 2), round(total, 1)))
+            if self._stop.wait(self.interval):
+                break
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def summary(self) -> Dict[str, Any]:
+        # 第一个采样点在服务器启动前, 基线取服务器开始工作后的第一个非零值
+        values = [mb for _, mb in self.samples if mb > 0]
+        if not values:
+            return {"samples": self.samples}
+        return {"start_mb": values[0], "peak_mb": max(values), "end_mb": values[-1],
+                "growth_mb": round(values[-1] - values[0], 1), "samples": self.samples}
+
+
+def _substitute(value: Any, variables: Dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return value.format(**variables)
+    if isinstance(value, dict):
+        return {k: _substitute(v, variables) for k, v in value.items()}
+    return value
+
+
+def _parse_result(result) -> Tuple[bool, Any]:
+    """CallToolResult -> (是否成功, 解析后的返回值)。工具以 {"error": ...} 表示的失败也算失败。"""
+    text = ''.join(getattr(c, 'text', '') for c in result.content)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = text
+    ok = not result.isError and not (isinstance(data, dict) and 'error' in data)
+    return ok, data
+
+
+async def run_client(index: int, connect, mix: str, iterations: int, base_url: str,
+                     browser_config: Dict[str, Any], calls: List[Dict[str, Any]]):
+    """一个模拟客户端: 建立会话、打开浏览器, 然后按工具组合循环 iterations 轮, 每次调用追加到 calls。"""
+    from mcp import ClientSession
+
+    async with connect() as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+
+            async def call(tool: str, arguments: Dict[str, Any]) -> Any:
+                start = time.perf_counter()
+                try:
+                    ok, data = _parse_result(await session.call_tool(tool, arguments))
+                except Exception as e:
+                    ok, data = False, str(e)
+                calls.append({"client": index, "tool": tool, "ok": ok,
+                              "ms": (time.perf_counter() - start) * 1000})
+                return data if ok else None
+
+            opened = await call('connect_or_open_browser', {'config': browser_config})
+            if not opened:
+                return
+            variables = {'base': base_url, 'tab': opened['tab_id']}
+            for _ in range(iterations):
+                for tool, arguments in MIXES[mix]:
+                    await call(tool, _substitute(arguments, variables))
+
+
+def _wait_for_port(port: int, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}.")
+        with socket.socket() as s:
+            if s.connect_ex(('127.0.0.1', port)) == 0:
+                return
+        time.sleep(0.2)
+    raise TimeoutError(f"Server did not listen on port {port} within {timeout}s.")
+
+
+def _quit_browser(debug_port: int):
+    """服务器进程退出后浏览器仍在运行, 按调试端口接管并关闭。"""
+    from DrissionPage import Chromium, ChromiumOptions
+    try:
+        co = ChromiumOptions().set_local_port(debug_port).existing_only(True)
+        Chromium(co).quit()
+    except Exception:
+        pass
+
+
+async def run_load_test(clients: int = 4, iterations: int = 10, mix: str = 'read', transport: str = 'stdio',
+                        port: int = 8765, debug_port: int = 9400, sample_interval: float = 1.0) -> Dict[str, Any]:
+    from mcp import StdioServerParameters
+    from mcp.client.stdio import stdio_client
+    from mcp.client.streamable_http import streamablehttp_client
+
+    server, base_url = serve_directory(os.path.join(ROOT, 'fixtures'))
+    sampler = RssSampler(sample_interval)
+    sampler.start()
+    http_server: Optional[subprocess.Popen] = None
+    calls: List[Dict[str, Any]] = []
+    try:
+        if transport == 'stdio':
+            params = StdioServerParameters(command=sys.executable, args=[os.path.join(ROOT, 'main.py')], cwd=ROOT)
+            connect = lambda: stdio_client(params)
+            configs = [{'debug_port': debug_port + i, 'headless': True} for i in range(clients)]
+        else:
+            http_server = subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, 'main.py'), '--transport', 'streamable-http', '--port', str(port),
+                 '--max-sessions', str(clients), '--debug-port', str(debug_port), '--headless'],
+                cwd=ROOT, stdout=subprocess.DEVNULL)
+            _wait_for_port(port, http_server)
+            connect = lambda: streamablehttp_client(f"http://127.0.0.1:{port}/mcp")
+            # 共享模式下服务器忽略客户端的浏览器配置
+            configs = [{}] * clients
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client(i, connect, mix, iterations, base_url, configs[i], calls)
+                               for i in range(clients)))
+        wall = time.perf_counter() - start
+    finally:
+        sampler.stop()
+        if http_server:
+            http_server.terminate()
+            http_server.wait(timeout=30)
+        for i in range(clients if transport == 'stdio' else 1):
+            _quit_browser(debug_port + i)
+        server.shutdown()
+
+    by_tool = defaultdict(list)
+    for c in calls:
+        by_tool[c["tool"]].append(c)
+    tools = {}
+    for tool, items in sorted(by_tool.items()):
+        latencies = [c["ms"] for c in items]
+        tools[tool] = {
+            "calls": len(items),
+            "errors": sum(not c["ok"] for c in items),
+            "mean_ms": round(sum(latencies) / len(latencies), 2),
+            "p50_ms": round(percentile(latencies, 50), 2),
+            "p95_ms": round(percentile(latencies, 95), 2),
+            "p99_ms": round(percentile(latencies, 99), 2),
+            "max_ms": round(max(latencies), 2),
+        }
+    return {
+        "config": {"clients": clients, "iterations": iterations, "mix": mix, "transport": transport},
+        "started_at": time.strftime('%Y-%m-%d %H:%M:%S'),
+        "wall_s": round(wall, 2),
+        "total_calls": len(calls),
+        "errors": sum(not c["ok"] for c in calls),
+        "throughput_calls_per_s": round(len(calls) / wall, 2) if wall else 0,
+        "tools": tools,
+        "rss": sampler.summary(),
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """与基线对比, 返回超出容忍比例的退化项 (吞吐量下降、p95 上升)。"""
+    regressions = []
+    if report["throughput_calls_per_s"] < baseline["throughput_calls_per_s"] * (1 - tolerance):
+        regressions.append(f"throughput {baseline['throughput_calls_per_s']} -> {report['throughput_calls_per_s']} calls/s")
+    for tool, stats in report["tools"].items():
+        old = baseline["tools"].get(tool)
+        if old and stats["p95_ms"] > old["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{tool} p95 {old['p95_ms']} -> {stats['p95_ms']} ms")
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="多客户端并发压测 MCP 服务器并报告吞吐量、延迟百分位和内存增长。")
+    parser.add_argument('--clients', type=int, default=4, help="并发客户端数量")
+    parser.add_argument('--iterations', type=int, default=10, help="每个客户端执行工具组合的轮数")
+    parser.add_argument('--mix', choices=sorted(MIXES), default='read', help="工具组合")
+    parser.add_argument('--transport', choices=['stdio', 'streamable-http'], default='stdio', help="传输方式")
+    parser.add_argument('--port', type=int, default=8765, help="streamable-http 模式的服务器端口")
+    parser.add_argument('--debug-port', type=int, default=9400, help="浏览器调试端口 (stdio 模式下每个客户端依次加 1)")
+    parser.add_argument('--output', help="结果 JSON 路径, 默认 LoadTests/<时间>.json")
+    parser.add_argument('--baseline', help="用于回归对比的历史结果 JSON")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="允许的退化比例, 默认 0.2 (20%%)")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load_test(args.clients, args.iterations, args.mix, args.transport,
+                                       args.port, args.debug_port))
+    output = args.output or os.path.join('LoadTests', f"{args.mix}-{args.transport}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps({k: v for k, v in report.items() if k != 'rss'}, indent=2, ensure_ascii=False))
+    print(f"RSS: {({k: v for k, v in report['rss'].items() if k != 'samples'})}  -> {output}")
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"[regression] {line}")
+    sys.exit(1 if report["errors"] or regressions else 0)
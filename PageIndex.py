@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class PageIndex:
+    """
+    get_visible_text 提取过的页面正文的全文索引 (SQLite FTS5)。
+
+    使用 trigram 分词器, 中英文都能做任意子串匹配 (不需要分词); 少于 3 个字符的查询无法走 trigram 索引,
+    退化为 LIKE 扫描, 但仍然只读数据库, 不需要重新打开网页或文本文件。同一 URL 重复提取时只保留最新一份。
+    """
+    def __init__(self, db_path: str = os.path.join('Web_info', 'pages.db')):
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5("
+                               "url UNINDEXED, title, ts UNINDEXED, text, tokenize='trigram')")
+        except sqlite3.OperationalError:
+            # SQLite < 3.34 没有 trigram 分词器
+            self._conn.execute("CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(url UNINDEXED, title, ts UNINDEXED, text)")
+        self._conn.commit()
+
+    def add(self, url: str, title: str, text: str):
+        with self._lock:
+            self._conn.execute('DELETE FROM pages WHERE url = ?', (url,))
+            self._conn.execute('INSERT INTO pages (url, title, ts, text) VALUES (?, ?, ?, ?)',
+                               (url, title, time.strftime('%Y-%m-%d %H:%M:%S'), text))
+            self._conn.commit()
+
+    @staticmethod
+    def _snippets(text: str, pattern: re.Pattern, max_snippets: int, width: int = 60) -> List[str]:
+        snippets = []
+        for m in pattern.finditer(text):
+            start, end = max(m.start() - width, 0), min(m.end() + width, len(text))
+            snippet = text[start:m.start()] + f"[{m.group(0)}]" + text[m.end():end]
+            snippets.append(('…' if start else '') + snippet.replace('\n', ' ') + ('…' if end < len(text) else ''))
+            if len(snippets) >= max_snippets:
+                break
+        return snippets
+
+    def search(self, query: str, mode: str = 'phrase', site: Optional[str] = None,
+               limit: int = 10, max_snippets: int = 3) -> Dict[str, Any]:
+        """
+        mode:
+            'phrase' 精确子串匹配 (默认)
+            'prefix' 以 query 开头的单词 (英文单词边界)
+            'fts'    原始 FTS5 查询表达式, 支持 AND / OR / NOT 和 "短语"
+        """
+        # trigram 和 LIKE 都不区分大小写, 统计出现次数时也要忽略大小写, 否则命中的页面会被当作 0 次而丢掉
+        if mode == 'fts':
+            where, args = 'pages MATCH ?', [query]
+            # 统计出现次数时只数查询里的短语和词, 忽略运算符
+            terms = [phrase or word.strip('()*') for phrase, word in re.findall(r'"([^"]+)"|(\S+)', query)]
+            terms = [t for t in terms if t and t not in ('AND', 'OR', 'NOT')]
+            pattern = re.compile('|'.join(re.escape(t) for t in terms) or re.escape(query), re.IGNORECASE)
+        elif len(query) >= 3:
+            where, args = 'pages MATCH ?', ['"' + query.replace('"', '""') + '"']
+            pattern = re.compile(r'\b' + re.escape(query) if mode == 'prefix' else re.escape(query), re.IGNORECASE)
+        else:
+            where, args = '(text LIKE ? OR title LIKE ?)', [f"%{query}%"] * 2
+            pattern = re.compile(r'\b' + re.escape(query) if mode == 'prefix' else re.escape(query), re.IGNORECASE)
+        if site:
+            # url 是 UNINDEXED 列, trigram 表会把 LIKE 约束交给全文索引处理, 这里用 instr 做普通过滤
+            where += ' AND instr(url, ?) > 0'
+            args.append(site)
+
+        with self._lock:
+            rows = self._conn.execute(f'SELECT url, title, ts, text FROM pages WHERE {where}', args).fetchall()
+
+        results, total = [], 0
+        for url, title, ts, text in rows:
+            occurrences = len(pattern.findall(text))
+            if not occurrences:
+                continue
+            total += occurrences
+            results.append({"url": url, "title": title, "extracted_at": ts, "occurrences": occurrences,
+                            "snippets": self._snippets(text, pattern, max_snippets)})
+        results.sort(key=lambda r: r["occurrences"], reverse=True)
+        return {"matched_pages": len(results), "total_occurrences": total, "results": results[:limit]}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"pages": self._conn.execute('SELECT COUNT(*) FROM pages').fetchone()[0]}
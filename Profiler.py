@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import base64
+import threading
+from typing import Any, Dict, List, Optional
+
+# DevTools "Performance" 面板录制时使用的主要分类, 包含 CPU 采样以便查看火焰图
+TRACE_CATEGORIES = ','.join([
+    'devtools.timeline', 'v8.execute', 'disabled-by-default-devtools.timeline',
+    'disabled-by-default-devtools.timeline.frame', 'disabled-by-default-v8.cpu_profiler',
+    'blink.user_timing', 'loading', 'latencyInfo',
+])
+
+
+def _metrics(tab) -> Dict[str, float]:
+    return {m['name']: m['value'] for m in tab.run_cdp('Performance.getMetrics')['metrics']}
+
+
+def _network_busy_ms(events: List[Dict[str, Any]]) -> float:
+    """根据 ResourceSendRequest / ResourceFinish 事件计算有请求在途的总时长 (区间并集)。"""
+    starts, intervals = {}, []
+    for event in events:
+        data = event.get('args', {}).get('data', {})
+        if event.get('name') == 'ResourceSendRequest':
+            starts.setdefault(data.get('requestId'), event['ts'])
+        elif event.get('name') == 'ResourceFinish' and data.get('requestId') in starts:
+            intervals.append((starts.pop(data['requestId']), event['ts']))
+    busy, current_end = 0.0, None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            busy += end - start
+            current_end = end
+        elif end > current_end:
+            busy += end - current_end
+            current_end = end
+    return round(busy / 1000, 1)
+
+
+class TraceSession:
+    """
+    用 CDP Tracing + Performance.getMetrics 包裹一次工具调用:
+
+        with TraceSession(tab, 'Traces', 'get') as trace:
+            tab.get(url)
+        trace.summary  # 脚本、布局、网络等待耗时和 JS 堆变化, trace.summary['trace_file'] 可拖入 DevTools 查看
+    """
+    def __init__(self, tab, trace_dir: str, label: str):
+        self.tab = tab
+        self.trace_dir = trace_dir
+        self.label = label
+        self.summary: Dict[str, Any] = {}
+        self._complete = threading.Event()
+        self._stream: Optional[str] = None
+
+    def _on_complete(self, **kwargs):
+        self._stream = kwargs.get('stream')
+        self._complete.set()
+
+    def __enter__(self):
+        self.tab.run_cdp('Performance.enable')
+        self._before = _metrics(self.tab)
+        self.tab.driver.set_callback('Tracing.tracingComplete', self._on_complete)
+        self.tab.run_cdp('Tracing.start', categories=TRACE_CATEGORIES, transferMode='ReturnAsStream')
+        self._start = time.perf_counter()
+        return self
+
+    def _read_stream(self) -> str:
+        chunks = []
+        while True:
+            res = self.tab.run_cdp('IO.read', handle=self._stream, size=1024 * 1024)
+            data = res.get('data', '')
+            chunks.append(base64.b64decode(data).decode('utf-8') if res.get('base64Encoded') else data)
+            if res.get('eof'):
+                break
+        self.tab.run_cdp('IO.close', handle=self._stream)
+        return ''.join(chunks)
+
+    def __exit__(self, exc_type, exc, tb):
+        wall_ms = (time.perf_counter() - self._start) * 1000
+        try:
+            after = _metrics(self.tab)
+            self.tab.run_cdp('Tracing.end')
+            if not self._complete.wait(timeout=30):
+                self.summary = {"error": "Tracing did not complete in 30s."}
+                return False
+            raw = self._read_stream()
+        finally:
+            self.tab.driver.set_callback('Tracing.tracingComplete', None)
+            self.tab.run_cdp('Performance.disable')
+
+        os.makedirs(self.trace_dir, exist_ok=True)
+        trace_file = os.path.abspath(os.path.join(
+            self.trace_dir, f"{self.label}-{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}.json"))
+        with open(trace_file, 'w', encoding='utf-8') as f:
+            f.write(raw)
+        trace = json.loads(raw)
+        events = trace.get('traceEvents', []) if isinstance(trace, dict) else trace
+
+        delta = lambda name: (after.get(name, 0) - self._before.get(name, 0)) * 1000
+        self.summary = {
+            "wall_ms": round(wall_ms, 1),
+            "script_ms": round(delta('ScriptDuration'), 1),
+            "layout_ms": round(delta('LayoutDuration') + delta('RecalcStyleDuration'), 1),
+            "task_ms": round(delta('TaskDuration'), 1),
+            "network_busy_ms": _network_busy_ms(events),
+            "js_heap_delta_kb": round((after.get('JSHeapUsedSize', 0) - self._before.get('JSHeapUsedSize', 0)) / 1024, 1),
+            "trace_file": trace_file,
+        }
+        return False
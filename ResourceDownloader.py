@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+import hashlib
+import mimetypes
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class ResourceDownloader:
+    """
+    并发下载页面引用的资源 (图片、视频、附件等) 到本地目录:
+
+    - 共用一个带连接池的 requests.Session, 建立连接时的失败和 429/5xx 由 urllib3 自动重试
+    - 每个主机同时最多 per_host 个下载, 总并发 max_workers
+    - 边下载边写入 .partial/ 下的临时文件, 同时在旁边的 .meta 文件中记下响应的 ETag / Last-Modified;
+      传输中断时带 If-Range 用 Range 请求从已写入的位置续传. 没有校验器、服务器返回 200 (不支持 Range 或文件已变化)
+      或 Content-Range 起点与已写入长度不一致时丢弃临时文件从头重新下载
+    - 下载完成后按 SHA-256 去重: 内容相同的文件只保留一份, 索引保存在目录下的 .index.json
+    """
+    def __init__(self, directory: str = 'Downloads', max_workers: int = 8, per_host: int = 4,
+                 retries: int = 3, timeout: float = 30, chunk_size: int = 64 * 1024):
+        self.directory = directory
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                      allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._host_limits: Dict[str, threading.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(directory, '.index.json')
+        # sha256 -> 相对于 directory 的文件名
+        self._index: Dict[str, str] = {}
+        if os.path.exists(self._index_path):
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                self._index = json.load(f)
+
+    def _host_limit(self, url: str) -> threading.Semaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.Semaphore(self.per_host)
+            return self._host_limits[host]
+
+    def _part_path(self, url: str) -> str:
+        return os.path.join(self.directory, '.partial', hashlib.sha1(url.encode('utf-8')).hexdigest() + '.part')
+
+    @staticmethod
+    def _filename(url: str, content_type: Optional[str]) -> str:
+        name = unquote(os.path.basename(urlsplit(url).path)) or 'index'
+        name = re.sub(r'[^\w\-.]', '_', name)[:100]
+        if not os.path.splitext(name)[1] and content_type:
+            name += mimetypes.guess_extension(content_type.split(';')[0].strip()) or ''
+        return name
+
+    @staticmethod
+    def _validator(response) -> Optional[str]:
+        """If-Range 只接受强 ETag 或 Last-Modified。"""
+        etag = response.headers.get('ETag')
+        if etag and not etag.startswith('W/'):
+            return etag
+        return response.headers.get('Last-Modified')
+
+    @staticmethod
+    def _discard(part: str):
+        for path in (part, part + '.meta'):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _fetch(self, url: str, headers: Dict[str, str], cookies) -> Dict[str, Any]:
+        part = self._part_path(url)
+        meta = part + '.meta'
+        resumed_from, content_type = 0, None
+        attempt = 0
+        while True:
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            validator = None
+            if offset and os.path.exists(meta):
+                with open(meta, 'r', encoding='utf-8') as f:
+                    validator = f.read().strip() or None
+            if offset and not validator:
+                # 无法确认服务器上的文件没有变化, 不能拼接, 从头下载
+                self._discard(part)
+                offset = 0
+            request_headers = dict(headers, Range=f"bytes={offset}-", **{'If-Range': validator}) if offset else headers
+            try:
+                with self.session.get(url, headers=request_headers, cookies=cookies, stream=True,
+                                      timeout=self.timeout) as response:
+                    if response.status_code == 416 and offset:
+                        # 临时文件已经完整 (上次在改名前中断)
+                        break
+                    response.raise_for_status()
+                    content_type = response.headers.get('Content-Type', content_type)
+                    if response.status_code == 206:
+                        match = re.match(r'bytes (\d+)-', response.headers.get('Content-Range', ''))
+                        if not match or int(match.group(1)) != offset:
+                            if not offset:
+                                raise ValueError(f"Unexpected Content-Range: {response.headers.get('Content-Range')}")
+                            # 返回的片段接不上已写入的内容, 丢弃后不带 Range 重新请求
+                            self._discard(part)
+                            resumed_from = 0
+                            continue
+                        resumed_from = resumed_from or offset
+                        mode = 'ab'
+                    else:
+                        resumed_from, mode = 0, 'wb'
+                        validator = self._validator(response)
+                        if validator:
+                            with open(meta, 'w', encoding='utf-8') as f:
+                                f.write(validator)
+                        elif os.path.exists(meta):
+                            os.remove(meta)
+                    with open(part, mode) as f:
+                        for chunk in response.iter_content(self.chunk_size):
+                            f.write(chunk)
+                break
+            except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+                attempt += 1
+        return {"part": part, "content_type": content_type, "resumed_from": resumed_from}
+
+    def _finish(self, url: str, fetched: Dict[str, Any]) -> Dict[str, Any]:
+        """计算哈希, 重复内容直接删除临时文件, 否则改名为正式文件。"""
+        digest = hashlib.sha256()
+        with open(fetched["part"], 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        size = os.path.getsize(fetched["part"])
+        if os.path.exists(fetched["part"] + '.meta'):
+            os.remove(fetched["part"] + '.meta')
+        with self._lock:
+            existing = self._index.get(sha256)
+            if existing and os.path.exists(os.path.join(self.directory, existing)):
+                os.remove(fetched["part"])
+                return {"url": url, "status": "duplicate", "path": os.path.abspath(os.path.join(self.directory, existing)),
+                        "bytes": size, "sha256": sha256, "resumed_from": fetched["resumed_from"]}
+            name = self._filename(url, fetched["content_type"])
+            if os.path.exists(os.path.join(self.directory, name)):
+                stem, ext = os.path.splitext(name)
+                name = f"{stem}-{sha256[:8]}{ext}"
+            os.replace(fetched["part"], os.path.join(self.directory, name))
+            self._index[sha256] = name
+            with open(self._index_path, 'w', encoding='utf-8') as f:
+                json.dump(self._index, f, ensure_ascii=False)
+        return {"url": url, "status": "downloaded", "path": os.path.abspath(os.path.join(self.directory, name)),
+                "bytes": size, "sha256": sha256, "resumed_from": fetched["resumed_from"]}
+
+    def _download_one(self, url: str, headers: Dict[str, str], cookies) -> Dict[str, Any]:
+        try:
+            with self._host_limit(url):
+                fetched = self._fetch(url, headers, cookies)
+            return self._finish(url, fetched)
+        except Exception as e:
+            return {"url": url, "status": "failed", "error": str(e)}
+
+    def download(self, urls: List[str], headers: Optional[Dict[str, str]] = None,
+                 cookies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        下载一组 URL。cookies 为 CDP Network.getCookies 格式的列表, 按各自的 domain/path 发送。
+        """
+        os.makedirs(os.path.join(self.directory, '.partial'), exist_ok=True)
+        jar = requests.cookies.RequestsCookieJar()
+        for c in cookies or []:
+            jar.set(c['name'], c['value'], domain=c.get('domain', ''), path=c.get('path', '/'))
+        urls = list(dict.fromkeys(urls))
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            files = list(pool.map(lambda u: self._download_one(u, headers or {}, jar), urls))
+        elapsed = time.perf_counter() - start
+
+        # 续传时之前已写入的部分不计入本次传输量
+        transferred = sum(f["bytes"] - f["resumed_from"] for f in files if f["status"] != "failed")
+        return {
+            "directory": os.path.abspath(self.directory),
+            "downloaded": sum(f["status"] == "downloaded" for f in files),
+            "duplicates": sum(f["status"] == "duplicate" for f in files),
+            "failed": sum(f["status"] == "failed" for f in files),
+            "bytes_transferred": transferred,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_mb_s": round(transferred / 1024 / 1024 / elapsed, 2) if elapsed else 0,
+            "files": files,
+        }
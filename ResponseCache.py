@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import json
+import time
+import base64
+import sqlite3
+import fnmatch
+import threading
+import functools
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+# 这些响应头与 Fetch.getResponseBody 返回的已解码响应体不再匹配, 存储时去掉
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+CACHEABLE_STATUS = {200, 203, 404, 410}
+# 没有声明缓存时间的响应, 只有这些静态资源类型 (Fetch.requestPaused 的 resourceType) 才使用 default_ttl
+STATIC_RESOURCE_TYPES = {'Stylesheet', 'Script', 'Image', 'Media', 'Font'}
+
+
+class ResponseCache:
+    """
+    基于 CDP Fetch 拦截的持久化 HTTP 响应缓存 (SQLite 存储), 浏览器所有标签页共用, 重启后仍然有效。
+
+    - 键: 方法 + URL + 响应 Vary 头所列的请求头取值
+    - 容量: 超过 max_bytes 时按最近访问时间 (LRU) 淘汰
+    - 过期: 优先使用 ttl_overrides 中匹配主机名的 TTL (支持通配符), 否则取 Cache-Control/Expires,
+      都没有时静态资源 (样式、脚本、图片、媒体、字体) 用 default_ttl, 其余 (页面、接口 JSON 等) 不缓存
+    - 不缓存带 Set-Cookie 或 Cache-Control 为 no-store/no-cache/private 的响应, 存储时也不保留 Set-Cookie 头
+    """
+    # 占用标签页的 Fetch.requestPaused 回调, 不能与录制/回放的流量拦截同时使用
+    uses_fetch = True
+
+    def __init__(self, cache_dir: str = 'Web_cache', max_bytes: int = 256 * 1024 * 1024,
+                 default_ttl: int = 3600, ttl_overrides: Optional[Dict[str, int]] = None):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.ttl_overrides = ttl_overrides or {}
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(cache_dir, 'responses.db'), check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS responses (
+            base_key TEXT, vary_key TEXT, vary_headers TEXT, url TEXT, status INTEGER,
+            headers TEXT, body BLOB, size INTEGER, expires_at REAL, last_access REAL,
+            PRIMARY KEY (base_key, vary_key))''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)')
+        self._conn.commit()
+
+    # --- 键与过期时间 ---
+
+    @staticmethod
+    def _vary_key(vary_headers: List[str], request_headers: Dict[str, str]) -> str:
+        lowered = {k.lower(): v for k, v in request_headers.items()}
+        return json.dumps([lowered.get(h, '') for h in vary_headers])
+
+    def _ttl(self, url: str, headers: Dict[str, str], resource_type: Optional[str] = None) -> Optional[int]:
+        """返回缓存秒数, None 表示不应缓存。"""
+        cache_control = headers.get('cache-control', '').lower()
+        if 'set-cookie' in headers or re.search(r'no-store|no-cache|private', cache_control):
+            return None
+        host = urlsplit(url).hostname or ''
+        for pattern, ttl in self.ttl_overrides.items():
+            if fnmatch.fnmatch(host, pattern):
+                return ttl
+        if match := re.search(r'(?:s-)?max-age=(\d+)', cache_control):
+            return int(match.group(1)) or None
+        if expires := headers.get('expires'):
+            try:
+                return max(int(parsedate_to_datetime(expires).timestamp() - time.time()), 0) or None
+            except (TypeError, ValueError):
+                return None
+        return self.default_ttl if resource_type in STATIC_RESOURCE_TYPES else None
+
+    # --- 读写 ---
+
+    def lookup(self, method: str, url: str, request_headers: Dict[str, str]) -> Optional[dict]:
+        base_key = f"{method} {url}"
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT vary_key, vary_headers, status, headers, body, size FROM responses '
+                'WHERE base_key = ? AND expires_at > ?', (base_key, now)).fetchall()
+            for vary_key, vary_headers, status, headers, body, size in rows:
+                if vary_key == self._vary_key(json.loads(vary_headers), request_headers):
+                    self._conn.execute('UPDATE responses SET last_access = ? WHERE base_key = ? AND vary_key = ?',
+                                       (now, base_key, vary_key))
+                    self._conn.commit()
+                    self.stats["hits"] += 1
+                    self.stats["bytes_saved"] += size
+                    return {"status": status, "headers": json.loads(headers), "body": body}
+            self.stats["misses"] += 1
+        return None
+
+    def store(self, method: str, url: str, request_headers: Dict[str, str], status: int,
+              response_headers: List[Dict[str, str]], body: bytes, resource_type: Optional[str] = None) -> bool:
+        headers = {h['name'].lower(): h['value'] for h in response_headers}
+        vary = [h.strip().lower() for h in headers.get('vary', '').split(',') if h.strip()]
+        ttl = self._ttl(url, headers, resource_type)
+        if ttl is None or '*' in vary:
+            return False
+        kept = [h for h in response_headers if h['name'].lower() not in DROPPED_HEADERS | {'set-cookie'}]
+        now = time.time()
+        with self._lock:
+            self._conn.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+                f"{method} {url}", self._vary_key(vary, request_headers), json.dumps(vary), url, status,
+                json.dumps(kept), body, len(body), now + ttl, now))
+            self.stats["stores"] += 1
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def _evict(self):
+        """删除过期条目, 然后按 LRU 淘汰直到总大小不超过上限。调用方需持有锁。"""
+        self._conn.execute('DELETE FROM responses WHERE expires_at <= ?', (time.time(),))
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for base_key, vary_key, size in self._conn.execute(
+                'SELECT base_key, vary_key, size FROM responses ORDER BY last_access').fetchall():
+            self._conn.execute('DELETE FROM responses WHERE base_key = ? AND vary_key = ?', (base_key, vary_key))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def summary(self) -> dict:
+        with self._lock:
+            entries, total = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone()
+        return {**self.stats, "entries": entries, "stored_bytes": total, "max_bytes": self.max_bytes}
+
+    # --- CDP 拦截 ---
+
+    def attach(self, tab) -> None:
+        """在标签页上开启拦截: GET 请求先查缓存, 未命中的响应在响应阶段写入缓存。"""
+        tab.driver.set_callback('Fetch.requestPaused', functools.partial(self._on_paused, tab))
+        tab.run_cdp('Fetch.enable', patterns=[
+            {'urlPattern': 'http*', 'requestStage': 'Request'},
+            {'urlPattern': 'http*', 'requestStage': 'Response'},
+        ])
+
+    def _on_paused(self, tab, **kwargs):
+        request_id = kwargs['requestId']
+        request = kwargs.get('request', {})
+        method, url = request.get('method', 'GET'), request.get('url', '')
+        try:
+            if method != 'GET':
+                tab.run_cdp('Fetch.continueRequest', requestId=request_id)
+                return
+
+            status = kwargs.get('responseStatusCode')
+            if status is None:
+                # 请求阶段: 命中则直接应答
+                cached = self.lookup(method, url, request.get('headers', {}))
+                if cached:
+                    tab.run_cdp('Fetch.fulfillRequest', requestId=request_id, responseCode=cached['status'],
+                                responseHeaders=cached['headers'],
+                                body=base64.b64encode(cached['body']).decode('ascii'))
+                else:
+                    tab.run_cdp('Fetch.continueRequest', requestId=request_id)
+                return
+
+            # 响应阶段: 可缓存的响应读取响应体后存储
+            if status in CACHEABLE_STATUS and not kwargs.get('responseErrorReason'):
+                res = tab.run_cdp('Fetch.getResponseBody', requestId=request_id)
+                body = base64.b64decode(res['body']) if res.get('base64Encoded') else res['body'].encode('utf-8')
+                self.store(method, url, request.get('headers', {}), status,
+                           kwargs.get('responseHeaders', []), body, kwargs.get('resourceType'))
+            tab.run_cdp('Fetch.continueRequest', requestId=request_id)
+        except Exception as e:
+            print(f"[!] Warning: Response cache failed on {url}: {e}", file=sys.stderr)
+            try:
+                tab.run_cdp('Fetch.continueRequest', requestId=request_id)
+            except Exception:
+                pass
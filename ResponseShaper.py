@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import json
+import uuid
+import inspect
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def dom_json_to_outline(dom_json: Any, indent: str = '  ') -> str:
+    """
+    将 domTreeToJson 生成的嵌套 JSON 转换为缩进大纲。
+    非叶子节点只保留标签名 (去掉计数后缀), 叶子节点保留完整标签描述, 体积通常只有 JSON 的一半左右。
+    """
+    if isinstance(dom_json, str):
+        dom_json = json.loads(dom_json)
+
+    lines = []
+    # domTreeToJson 的键是 "标签名 + 该标签的序号", 序号按先序遍历逐个标签递增。
+    # h1、h2 等标签名本身以数字结尾, 不能简单去掉末尾数字, 这里按同样的顺序重放计数器来确定标签名
+    counters: Dict[str, int] = {}
+
+    def tag_of(key: str) -> str:
+        candidates = [(key[:i], int(key[i:])) for i in range(len(key) - 1, 0, -1)
+                      if key[i:].isdigit() and (key[i] != '0' or i == len(key) - 1)]
+        matches = [tag for tag, n in candidates if counters.get(tag, 0) == n]
+        if not matches:
+            # 最外层由 buildDomJsonTree 生成的键没有序号
+            return key
+        # 既可以是已出现过的标签、也可以是新标签时 (如 'h110'), 取已出现过的
+        tag = next((t for t in matches if counters.get(t, 0) > 0), matches[0])
+        counters[tag] = counters.get(tag, 0) + 1
+        return tag
+
+    def walk(node: Any, depth: int):
+        for key, value in node.items():
+            tag = tag_of(key)
+            if isinstance(value, dict):
+                lines.append(f"{indent * depth}{tag}")
+                walk(value, depth + 1)
+            else:
+                lines.append(f"{indent * depth}{value}")
+
+    walk(dom_json, 0)
+    return '\n'.join(lines)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数: ASCII 约 4 字符 1 token, 其余 (如中文) 约 1 字符 1 token。"""
+    ascii_chars = sum(1 for c in text if ord(c) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+class ResponseShaper:
+    """
+    工具返回值的整形层: 为每次调用设置字节预算, 超出部分截断并存入续读游标,
+    同时在返回值中说明被省略的内容, 以减小 MCP 传输和模型上下文的负担。
+    """
+    def __init__(self, max_bytes: int = 16000, max_list_items: int = 50, max_cursors: int = 64):
+        self.max_bytes = max_bytes
+        self.max_list_items = max_list_items
+        self.max_cursors = max_cursors
+        self._cursors: "OrderedDict[str, str]" = OrderedDict()
+
+    # --- 游标管理 ---
+
+    def _store(self, rest: str) -> str:
+        """保存被截断的剩余内容, 返回游标。超出上限时淘汰最早的游标。"""
+        cursor = f"cur-{uuid.uuid4().hex[:12]}"
+        self._cursors[cursor] = rest
+        while len(self._cursors) > self.max_cursors:
+            self._cursors.popitem(last=False)
+        return cursor
+
+    def resume(self, cursor: str) -> str:
+        """取出游标对应的剩余内容 (一次性), 再次整形时会生成新的游标。"""
+        rest = self._cursors.pop(cursor, None)
+        if rest is None:
+            raise KeyError(f"Cursor '{cursor}' not found or expired.")
+        return rest
+
+    # --- 截断 ---
+
+    @staticmethod
+    def _size(value: Any) -> int:
+        if isinstance(value, str):
+            return len(value.encode('utf-8'))
+        return len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+
+    @staticmethod
+    def _cut(text: str, limit: int) -> Tuple[str, str]:
+        """按 UTF-8 字节数截断字符串, 保证不会切断多字节字符。"""
+        head = text.encode('utf-8')[:max(limit, 0)].decode('utf-8', errors='ignore')
+        return head, text[len(head):]
+
+    def _shape_text(self, text: str, budget: int) -> Tuple[str, Optional[Dict[str, Any]]]:
+        if self._size(text) <= budget:
+            return text, None
+        head, rest = self._cut(text, budget)
+        elided = {
+            "omitted_bytes": self._size(rest),
+            "approx_tokens": estimate_tokens(rest),
+            "cursor": self._store(rest),
+        }
+        return head, elided
+
+    def _collect_fields(self, data: Any, path: str, out: List[Tuple[str, Any, Any]]):
+        """收集所有可截断的字段: (路径, 所属容器, 键)。"""
+        if isinstance(data, dict):
+            items = data.items()
+        elif isinstance(data, list):
+            items = enumerate(data)
+        else:
+            return
+        for key, value in items:
+            sub_path = f"{path}.{key}" if path else str(key)
+            if isinstance(value, str) or (isinstance(value, list) and len(value) > self.max_list_items):
+                out.append((sub_path, data, key))
+            if isinstance(value, (dict, list)):
+                self._collect_fields(value, sub_path, out)
+
+    def _shape_container(self, data: Any) -> Tuple[Any, List[Dict[str, Any]]]:
+        """对 dict/list 结果整形: 先裁剪过长列表, 再从最大的字符串字段开始截断, 直到满足预算。"""
+        data = json.loads(json.dumps(data, ensure_ascii=False, default=str))
+        elided = []
+
+        fields = []
+        self._collect_fields(data, '', fields)
+        for path, parent, key in fields:
+            value = parent[key]
+            if isinstance(value, list) and len(value) > self.max_list_items:
+                rest = value[self.max_list_items:]
+                parent[key] = value[:self.max_list_items]
+                elided.append({
+                    "path": path,
+                    "omitted_items": len(rest),
+                    "cursor": self._store(json.dumps(rest, ensure_ascii=False)),
+                })
+
+        fields = []
+        self._collect_fields(data, '', fields)
+        strings = [(p, c, k) for p, c, k in fields if isinstance(c[k], str)]
+        strings.sort(key=lambda f: self._size(f[1][f[2]]), reverse=True)
+        for path, parent, key in strings:
+            overflow = self._size(data) - self.max_bytes
+            if overflow <= 0:
+                break
+            value = parent[key]
+            keep = max(self._size(value) - overflow - 200, 200)
+            if keep >= self._size(value):
+                continue
+            parent[key], info = self._shape_text(value, keep)
+            info["path"] = path
+            elided.append(info)
+        return data, elided
+
+    def shape(self, result: Any) -> Any:
+        """按预算整形一次工具返回值。bytes/int/bool 等非文本结果原样返回。"""
+        if isinstance(result, str):
+            if self._size(result) <= self.max_bytes:
+                return result
+            head, info = self._shape_text(result, self.max_bytes - 200)
+            return (f"{head}\n\n[已截断: 省略 {info['omitted_bytes']} 字节 (约 {info['approx_tokens']} tokens), "
+                    f"使用 read_more(cursor='{info['cursor']}') 继续读取]")
+
+        if isinstance(result, (dict, list)):
+            if self._size(result) <= self.max_bytes and not (
+                    isinstance(result, list) and len(result) > self.max_list_items):
+                return result
+            wrapped = isinstance(result, list)
+            shaped, elided = self._shape_container({"items": result} if wrapped else result)
+            if not elided:
+                return result
+            if wrapped:
+                return shaped["items"] + [{"_elided": elided}]
+            shaped["_elided"] = elided
+            return shaped
+
+        return result
+
+    def wrap(self, method: Callable) -> Callable:
+        """包装一个工具方法, 保留其签名 (FastMCP 依赖签名生成参数模型) 并对返回值整形。"""
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                return self.shape(await method(*args, **kwargs))
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            return self.shape(method(*args, **kwargs))
+        return wrapper
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+import json
+from typing import Any, Dict, List, Optional
+
+# 调用已安装脚本的引导代码, 每次调用只发送这几行, 而不是整段脚本
+CALL_SCRIPT = '''
+const [name, args, limit] = arguments;
+const fn = window.__dpScripts && window.__dpScripts[name];
+if (!fn) return {__dp_missing: true};
+return Promise.resolve(fn.apply(null, args)).then(result => {
+  if (!limit) return result;
+  const text = typeof result === 'string' ? result
+    : (result instanceof Node || result === undefined) ? '' : (JSON.stringify(result) || '');
+  const size = new TextEncoder().encode(text).length;
+  return size > limit ? {__dp_too_large: size} : result;
+});
+'''
+
+
+class ScriptRegistry:
+    """
+    具名页面脚本注册表: 脚本只注册一次, 通过 Page.addScriptToEvaluateOnNewDocument 预装到标签页 (跨导航保留),
+    之后按名字调用, 每次只传名字和参数, 省去重复传输脚本源码和 V8 重新编译。
+
+    脚本写法与 run_javascript 相同: 一段函数体, 用 return 返回结果, 参数通过 arguments[i] 获取。
+    内置脚本 (builtin=True) 的返回值不受 max_return_bytes 限制, 由调用它的工具自行裁剪。
+    """
+    def __init__(self, max_arg_bytes: int = 64 * 1024, max_return_bytes: int = 1024 * 1024):
+        self.max_arg_bytes = max_arg_bytes
+        self.max_return_bytes = max_return_bytes
+        self.scripts: Dict[str, str] = {}
+        self.builtins: set = set()
+        # tab_id -> {脚本名: addScriptToEvaluateOnNewDocument 返回的 identifier}
+        self._installed: Dict[str, Dict[str, str]] = {}
+
+    @staticmethod
+    def _install_source(name: str, body: str) -> str:
+        return (
+            "(() => {"
+            " if (!window.__dpScripts) Object.defineProperty(window, '__dpScripts', {value: {}, enumerable: false});"
+            f" window.__dpScripts[{json.dumps(name)}] = function() {{\n{body}\n}};"
+            " })();"
+        )
+
+    def register(self, name: str, body: str, tabs: Optional[List[Any]] = None, builtin: bool = False):
+        """注册 (或替换) 脚本。替换时从已安装的标签页中移除旧版本, 下次调用时重新安装。"""
+        self.scripts[name] = body
+        if builtin:
+            self.builtins.add(name)
+        else:
+            self.builtins.discard(name)
+        for tab in tabs or []:
+            identifier = self._installed.get(tab.tab_id, {}).pop(name, None)
+            if identifier:
+                try:
+                    tab.run_cdp('Page.removeScriptToEvaluateOnNewDocument', identifier=identifier)
+                except Exception:
+                    pass
+
+    def _install(self, tab, name: str):
+        source = self._install_source(name, self.scripts[name])
+        installed = self._installed.setdefault(tab.tab_id, {})
+        if name not in installed:
+            installed[name] = tab.run_cdp('Page.addScriptToEvaluateOnNewDocument', source=source)['identifier']
+        # 新文档加载时才会自动执行, 当前文档需要立即执行一次
+        tab.run_js(source, as_expr=True)
+
+    def call(self, tab, name: str, args: Optional[List[Any]] = None) -> Any:
+        if name not in self.scripts:
+            raise KeyError(f"Script '{name}' is not registered.")
+        args = args or []
+        arg_size = len(json.dumps(args, ensure_ascii=False).encode('utf-8'))
+        if arg_size > self.max_arg_bytes:
+            raise ValueError(f"Arguments too large: {arg_size} bytes > {self.max_arg_bytes}.")
+
+        if name not in self._installed.get(tab.tab_id, {}):
+            self._install(tab, name)
+        limit = 0 if name in self.builtins else self.max_return_bytes
+        result = tab.run_js(CALL_SCRIPT, name, args, limit)
+        if isinstance(result, dict) and result.get('__dp_missing'):
+            # 例如 about:blank 等不触发预装脚本的文档
+            self._install(tab, name)
+            result = tab.run_js(CALL_SCRIPT, name, args, limit)
+        if isinstance(result, dict) and '__dp_too_large' in result:
+            raise ValueError(f"Return value too large: {result['__dp_too_large']} bytes > {self.max_return_bytes}.")
+        return result
+
+    def forget_tab(self, tab_id: str):
+        self._installed.pop(tab_id, None)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [{"name": name, "bytes": len(body.encode('utf-8')), "builtin": name in self.builtins}
+                for name, body in self.scripts.items()]
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import time
+import asyncio
+import inspect
+import sys
+import weakref
+import functools
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from mcp.server.fastmcp import Context
+
+
+class SessionPool:
+    """
+    多客户端共享一个常驻浏览器时的会话池 (HTTP/SSE 传输使用)。
+
+    - 每个 MCP 会话拥有独立的 DrissionPageMCP 实例: 自己的标签页、元素缓存、监听器和续读游标
+    - 所有实例共用同一个预热好的浏览器, 新会话无需重新启动/连接 Chromium
+    - 准入控制: 会话数达到 max_sessions 时先回收空闲超时的会话, 仍然满员则拒绝新会话;
+      同时最多 max_concurrent_calls 个工具调用在线程池中并发执行
+    - 共享浏览器断开时 (看门狗检测到) 由 reconnect 只重建一次, 并切换所有会话到新浏览器
+    """
+    def __init__(self, agent_factory: Callable[[], Any], max_sessions: int = 8,
+                 idle_timeout: float = 1800, max_concurrent_calls: int = 8,
+                 browser_factory: Optional[Callable[[], Any]] = None):
+        self.agent_factory = agent_factory
+        self.browser_factory = browser_factory
+        # 预热的共享浏览器, 新会话的实例使用它
+        self.browser = browser_factory() if browser_factory else None
+        self._reconnect_lock = threading.Lock()
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self._agents: Dict[int, Any] = {}
+        self._last_used: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        self._calls = asyncio.Semaphore(max_concurrent_calls)
+        self.stats = {"sessions_opened": 0, "sessions_closed": 0, "rejected": 0}
+
+    def _release(self, key: int):
+        """会话结束或空闲超时时关闭它的标签页并移除实例。"""
+        with self._lock:
+            agent = self._agents.pop(key, None)
+            self._last_used.pop(key, None)
+        if agent is None:
+            return
+        self.stats["sessions_closed"] += 1
+        for tab_id in list(agent.owned_tabs or []):
+            try:
+                agent.close_tab(tab_id)
+            except Exception as e:
+                print(f"[!] Warning: Failed to close tab {tab_id} of a released session: {e}", file=sys.stderr)
+
+    def _reap_idle(self):
+        now = time.time()
+        idle = [key for key, last in list(self._last_used.items()) if now - last > self.idle_timeout]
+        for key in idle:
+            self._release(key)
+
+    def agent_for(self, session: Any) -> Any:
+        """返回会话对应的实例, 新会话在通过准入检查后创建。"""
+        key = id(session)
+        with self._lock:
+            agent = self._agents.get(key)
+        if agent is None:
+            if len(self._agents) >= self.max_sessions:
+                self._reap_idle()
+            with self._lock:
+                if len(self._agents) >= self.max_sessions:
+                    self.stats["rejected"] += 1
+                    raise RuntimeError(f"Server is busy: {len(self._agents)}/{self.max_sessions} sessions active, try again later.")
+                agent = self._agents[key] = self.agent_factory()
+            self.stats["sessions_opened"] += 1
+            # 会话对象被回收 (连接断开) 时自动释放
+            weakref.finalize(session, self._release, key)
+        self._last_used[key] = time.time()
+        return agent
+
+    def reconnect(self, stale_browser: Any):
+        """
+        重建共享浏览器并切换所有会话。多个会话的看门狗可能同时发现断开,
+        只有第一个 (其持有的仍是当前浏览器) 会真正重建, 其余直接切换到已重建的浏览器。
+        """
+        with self._reconnect_lock:
+            if self.browser is stale_browser:
+                self.browser = self.browser_factory()
+            browser = self.browser
+        with self._lock:
+            agents = list(self._agents.values())
+        for agent in agents:
+            if agent.browser is not browser:
+                agent._reset_browser(browser)
+
+    def status(self) -> dict:
+        return {**self.stats, "active_sessions": len(self._agents), "max_sessions": self.max_sessions}
+
+    @staticmethod
+    def _call_blocking(method: Callable, kwargs: dict) -> Any:
+        """在工作线程中执行工具方法。DrissionPage 的调用是同步阻塞的, 放在线程里才不会卡住其他会话。"""
+        result = method(**kwargs)
+        if inspect.isawaitable(result):
+            result = asyncio.run(result)
+        return result
+
+    def dispatcher(self, name: str, template: Callable) -> Callable:
+        """
+        生成注册到 FastMCP 的工具函数: 参数与 template 相同, 额外注入 Context,
+        调用时转发到当前会话的实例, 并用该实例自己的整形层处理返回值。
+        """
+        async def dispatch(ctx: Context, **kwargs):
+            agent = self.agent_for(ctx.session)
+            async with self._calls:
+                result = await asyncio.to_thread(self._call_blocking, getattr(agent, name), kwargs)
+            return agent.shaper.shape(result)
+
+        functools.update_wrapper(dispatch, template)
+        del dispatch.__wrapped__
+        signature = inspect.signature(template)
+        context_param = inspect.Parameter('ctx', inspect.Parameter.KEYWORD_ONLY, annotation=Context)
+        dispatch.__signature__ = signature.replace(parameters=[*signature.parameters.values(), context_param])
+        return dispatch
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python
+"""
+工具调用与网络流量的录制/回放, 用于离线、可复现的性能基准测试。
+
+录制: python main.py --record <归档目录>
+回放: python SessionRecorder.py <归档目录> [--headed]
+
+归档目录包含两个文件:
+    calls.jsonl    每行一次工具调用 (工具名、参数、返回值、耗时)
+    traffic.jsonl  每行一个网络响应 (方法、URL、请求体哈希、状态码、响应头、base64 响应体)
+"""
+import os
+import re
+import sys
+import json
+import time
+import base64
+import shutil
+import socket
+import tempfile
+import hashlib
+import inspect
+import asyncio
+import argparse
+import functools
+import threading
+import statistics
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+# 回放时这些响应头与 Fetch.getResponseBody 返回的已解码响应体不再匹配, 需要去掉
+DROPPED_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding'}
+# 回放时跳过的工具: 响应缓存同样通过 Fetch 拦截请求, 会替换掉回放用的拦截处理函数, 使请求走真实网络
+REPLAY_SKIPPED_TOOLS = {'enable_response_cache'}
+# 返回值中这些键对应的 ID 每次运行都会变化, 回放时需要按出现顺序重新映射
+VOLATILE_ID_KEYS = ('element_id', 'tab_id')
+# 嵌在文本中的易变 ID: 无障碍快照的节点 ID (ax-<标签页>-<backendNodeId>) 和截断结果的续读游标
+VOLATILE_ID_PATTERN = re.compile(r'\bax-[0-9A-Fa-f]{4}-\d+\b|\bcur-[0-9a-f]{12}\b')
+
+
+def traffic_key(method: str, url: str, post_data: Optional[str]) -> str:
+    """请求的匹配键: 方法 + URL + 请求体哈希。"""
+    digest = hashlib.sha1((post_data or '').encode('utf-8')).hexdigest()[:12] if post_data else '-'
+    return f"{method} {url} {digest}"
+
+
+def collect_ids(data: Any, out: Optional[List[str]] = None) -> List[str]:
+    """按出现顺序收集返回值中的易变 ID。"""
+    if out is None:
+        out = []
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if key in VOLATILE_ID_KEYS and isinstance(value, str):
+                out.append(value)
+            else:
+                collect_ids(value, out)
+    elif isinstance(data, list):
+        for item in data:
+            collect_ids(item, out)
+    elif isinstance(data, str):
+        out.extend(VOLATILE_ID_PATTERN.findall(data))
+    return out
+
+
+class TrafficRecorder:
+    """通过 CDP Fetch 在响应阶段拦截请求, 记录响应后放行。"""
+    # 占用标签页的 Fetch.requestPaused 回调 (每个事件只能有一个), 见 DrissionPageMCP.enable_response_cache
+    uses_fetch = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def attach(self, tab) -> None:
+        tab.driver.set_callback('Fetch.requestPaused', functools.partial(self._on_paused, tab))
+        tab.run_cdp('Fetch.enable', patterns=[{'urlPattern': '*', 'requestStage': 'Response'}])
+
+    def _on_paused(self, tab, **kwargs):
+        request_id = kwargs['requestId']
+        request = kwargs.get('request', {})
+        try:
+            status = kwargs.get('responseStatusCode')
+            if status is not None and not kwargs.get('responseErrorReason'):
+                body = ''
+                if not 300 <= status < 400:
+                    res = tab.run_cdp('Fetch.getResponseBody', requestId=request_id)
+                    body = res['body'] if res.get('base64Encoded') else \
+                        base64.b64encode(res['body'].encode('utf-8')).decode('ascii')
+                record = {
+                    "key": traffic_key(request.get('method', 'GET'), request.get('url', ''), request.get('postData')),
+                    "status": status,
+                    "headers": [h for h in kwargs.get('responseHeaders', [])
+                                if h['name'].lower() not in DROPPED_HEADERS],
+                    "body": body,
+                }
+                with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        except Exception as e:
+            print(f"[!] Warning: Failed to record {request.get('url')}: {e}", file=sys.stderr)
+        finally:
+            try:
+                tab.run_cdp('Fetch.continueRequest', requestId=request_id)
+            except Exception:
+                pass
+
+
+class TrafficReplayer:
+    """通过 CDP Fetch 在请求阶段拦截请求, 用归档中的响应直接应答, 未录制的请求按断网处理。"""
+    uses_fetch = True
+
+    def __init__(self, path: str):
+        self.responses: Dict[str, List[dict]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self.misses: List[str] = []
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = json.loads(line)
+                    self.responses[record['key']].append(record)
+
+    def attach(self, tab) -> None:
+        tab.driver.set_callback('Fetch.requestPaused', functools.partial(self._on_paused, tab))
+        tab.run_cdp('Fetch.enable', patterns=[{'urlPattern': '*', 'requestStage': 'Request'}])
+
+    def _on_paused(self, tab, **kwargs):
+        request = kwargs.get('request', {})
+        key = traffic_key(request.get('method', 'GET'), request.get('url', ''), request.get('postData'))
+        candidates = self.responses.get(key)
+        try:
+            if not candidates:
+                self.misses.append(key)
+                tab.run_cdp('Fetch.failRequest', requestId=kwargs['requestId'], errorReason='InternetDisconnected')
+                return
+            # 同一请求出现多次时按录制顺序依次应答, 用完后重复最后一个
+            index = min(self._served[key], len(candidates) - 1)
+            self._served[key] += 1
+            record = candidates[index]
+            tab.run_cdp('Fetch.fulfillRequest', requestId=kwargs['requestId'], responseCode=record['status'],
+                        responseHeaders=record['headers'], body=record['body'])
+        except Exception as e:
+            print(f"[!] Warning: Failed to replay {request.get('url')}: {e}", file=sys.stderr)
+
+
+class SessionRecorder:
+    """录制模式: 记录每次工具调用, 并把它们触发的网络流量写入归档目录。"""
+    def __init__(self, archive_dir: str):
+        os.makedirs(archive_dir, exist_ok=True)
+        self.calls_path = os.path.join(archive_dir, 'calls.jsonl')
+        self.traffic = TrafficRecorder(os.path.join(archive_dir, 'traffic.jsonl'))
+        self._lock = threading.Lock()
+
+    def _log(self, name: str, kwargs: dict, result: Any, elapsed: float, error: Optional[str]):
+        record = {
+            "tool": name,
+            "kwargs": kwargs,
+            # 截图等二进制结果不写入归档
+            "result": None if isinstance(result, bytes) else result,
+            "latency_ms": round(elapsed * 1000, 2),
+            "error": error,
+        }
+        with self._lock, open(self.calls_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def wrap(self, name: str, method: Callable) -> Callable:
+        """包装一个工具方法, 保留签名并记录调用。"""
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(**kwargs):
+                start, result, error = time.perf_counter(), None, None
+                try:
+                    result = await method(**kwargs)
+                    return result
+                except Exception as e:
+                    error = str(e)
+                    raise
+                finally:
+                    self._log(name, kwargs, result, time.perf_counter() - start, error)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(**kwargs):
+            start, result, error = time.perf_counter(), None, None
+            try:
+                result = method(**kwargs)
+                return result
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                self._log(name, kwargs, result, time.perf_counter() - start, error)
+        return wrapper
+
+
+def _remap(data: Any, id_map: Dict[str, str]) -> Any:
+    if isinstance(data, str):
+        if data in id_map:
+            return id_map[data]
+        return VOLATILE_ID_PATTERN.sub(lambda m: id_map.get(m.group(0), m.group(0)), data)
+    if isinstance(data, dict):
+        return {k: _remap(v, id_map) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_remap(v, id_map) for v in data]
+    return data
+
+
+async def replay_session(archive_dir: str, headless: bool = True) -> Dict[str, Any]:
+    """
+    用归档中的流量替代真实网络, 按顺序重新执行录制的工具调用, 返回每个工具的耗时统计。
+    """
+    from main import DrissionPageMCP
+
+    with open(os.path.join(archive_dir, 'calls.jsonl'), 'r', encoding='utf-8') as f:
+        calls = [json.loads(line) for line in f]
+
+    # 回放使用独立端口和临时用户目录启动自己的浏览器, 不接管 9222 上已有的浏览器, 也不带入其中的登录状态
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        debug_port = sock.getsockname()[1]
+    user_data_path = tempfile.mkdtemp(prefix='dp_replay_')
+
+    agent = DrissionPageMCP()
+    replayer = TrafficReplayer(os.path.join(archive_dir, 'traffic.jsonl'))
+    agent.tab_hooks.append(replayer.attach)
+
+    id_map: Dict[str, str] = {}
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    recorded: Dict[str, List[float]] = defaultdict(list)
+    failures, skipped = [], []
+    for call in calls:
+        name, kwargs = call['tool'], _remap(call['kwargs'], id_map)
+        if name in REPLAY_SKIPPED_TOOLS:
+            skipped.append(name)
+            continue
+        if name == 'connect_or_open_browser':
+            kwargs = {"config": {**kwargs.get('config', {}), "debug_port": debug_port,
+                                 "user_data_path": user_data_path, "headless": headless}}
+        method = getattr(agent, name)
+        start, result = time.perf_counter(), None
+        try:
+            result = method(**kwargs)
+            if inspect.isawaitable(result):
+                result = await result
+            # 与录制时一样经过整形层, 截断结果的续读游标才能和录制的一一对应
+            result = agent.shaper.shape(result)
+        except Exception as e:
+            failures.append({"tool": name, "error": str(e)})
+        latencies[name].append((time.perf_counter() - start) * 1000)
+        recorded[name].append(call['latency_ms'])
+        # 新旧返回值中的 ID 按出现顺序一一对应
+        for old, new in zip(collect_ids(call['result']), collect_ids(result)):
+            id_map[old] = new
+
+    report = {"tools": {}, "failures": failures, "skipped": skipped, "unrecorded_requests": len(replayer.misses)}
+    for name, values in latencies.items():
+        values_sorted = sorted(values)
+        report["tools"][name] = {
+            "calls": len(values),
+            "mean_ms": round(statistics.mean(values), 2),
+            "p50_ms": round(statistics.median(values), 2),
+            "max_ms": round(values_sorted[-1], 2),
+            "recorded_mean_ms": round(statistics.mean(recorded[name]), 2),
+        }
+    if agent.browser:
+        agent.browser.quit()
+    shutil.rmtree(user_data_path, ignore_errors=True)
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="离线回放录制的工具调用序列并报告每个工具的耗时。")
+    parser.add_argument('archive_dir', help="录制时 --record 指定的归档目录")
+    parser.add_argument('--headed', action='store_true', help="显示浏览器窗口")
+    args = parser.parse_args()
+    report = asyncio.run(replay_session(args.archive_dir, headless=not args.headed))
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(1 if report["failures"] else 0)
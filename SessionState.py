@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+# Network.setCookies 接受的字段, Network.getCookies 返回的其余字段 (size、session 等) 需要去掉
+COOKIE_PARAM_KEYS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'sameSite',
+                     'expires', 'priority', 'sameParty', 'sourceScheme', 'sourcePort', 'partitionKey')
+
+
+def normalize_origin(url: str) -> str:
+    """'https://github.com/login' -> 'https://github.com'"""
+    parts = urlsplit(url if '://' in url else f"https://{url}")
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def clean_cookie(cookie: Dict[str, Any]) -> Dict[str, Any]:
+    cleaned = {k: cookie[k] for k in COOKIE_PARAM_KEYS if k in cookie}
+    if cookie.get('session') or cleaned.get('expires', -1) <= 0:
+        cleaned.pop('expires', None)
+    return cleaned
+
+
+class SessionStateStore:
+    """
+    登录状态快照 (cookies + localStorage/sessionStorage + IndexedDB) 的命名存档, 每个存档一个 JSON 文件。
+
+    存档记录保存时间和过期时间: 过期时间取所有持久 cookie 中最早的过期时刻 (会话 cookie 不参与),
+    恢复时会跳过已过期的 cookie 并在结果中提示。
+    """
+    def __init__(self, directory: str = 'Profiles'):
+        self.directory = directory
+
+    def _path(self, name: str) -> str:
+        safe_name = re.sub(r'[^\w\-.]', '_', name)
+        return os.path.join(self.directory, f"{safe_name}.json")
+
+    def save(self, name: str, cookies: List[Dict[str, Any]], origins: Dict[str, Any]) -> Dict[str, Any]:
+        os.makedirs(self.directory, exist_ok=True)
+        expiries = [c['expires'] for c in cookies if c.get('expires', -1) > 0]
+        profile = {
+            "name": name,
+            "saved_at": time.time(),
+            "expires_at": min(expiries) if expiries else None,
+            "cookies": [clean_cookie(c) for c in cookies],
+            "origins": origins,
+        }
+        with open(self._path(name), 'w', encoding='utf-8') as f:
+            json.dump(profile, f, ensure_ascii=False)
+        return profile
+
+    def load(self, name: str) -> Optional[Dict[str, Any]]:
+        path = self._path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def live_cookies(profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """去掉已经过期的 cookie。"""
+        now = time.time()
+        return [c for c in profile["cookies"] if c.get('expires', -1) <= 0 or c['expires'] > now]
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.directory):
+            return []
+        now = time.time()
+        profiles = []
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith('.json'):
+                continue
+            with open(os.path.join(self.directory, filename), 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+            profiles.append({
+                "name": profile["name"],
+                "origins": list(profile["origins"]),
+                "saved_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(profile["saved_at"])),
+                "expires_at": time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(profile["expires_at"]))
+                              if profile["expires_at"] else None,
+                "expired": bool(profile["expires_at"] and profile["expires_at"] <= now),
+            })
+        return profiles
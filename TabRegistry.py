@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+
+class TabRegistry:
+    """
+    由 CDP Target.* 事件维护的标签页元数据表 (tab_id -> 标题、URL)。
+
+    表在连接时通过一次 Target.getTargets 初始化, 之后只靠 targetCreated / targetInfoChanged / targetDestroyed
+    事件增量更新, 因此列出标签页、取最新标签页、统计数量都是内存查询, 不需要 CDP 往返。
+    同一个浏览器连接只创建一个实例 (见 for_browser), 共享浏览器的所有会话共用。
+    """
+    _registries_lock = threading.Lock()
+
+    def __init__(self, browser):
+        self._lock = threading.Lock()
+        # 按最近创建/激活的先后排序, 最后一个即为最新的标签页
+        self._tabs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._attached: Dict[str, bool] = {}
+        self.driver = driver = browser._driver
+        for event, handler in (('Target.targetCreated', self._on_created),
+                               ('Target.targetInfoChanged', self._on_changed),
+                               ('Target.targetDestroyed', self._on_destroyed)):
+            driver.set_callback(event, self._chain(driver, event, handler))
+        browser._run_cdp('Target.setDiscoverTargets', discover=True)
+        for info in browser._run_cdp('Target.getTargets')['targetInfos']:
+            self._update(info)
+        # Target.getTargets 的顺序不是最近使用顺序; browser.tab_ids 与 latest_tab 一致, 最新的在前
+        for tab_id in reversed(browser.tab_ids):
+            self.touch(tab_id)
+
+    @classmethod
+    def for_browser(cls, browser) -> 'TabRegistry':
+        """
+        注册表保存在浏览器对象上, 随浏览器对象一起释放; 重连后驱动对象变化时重新创建,
+        避免继续使用绑定在已断开驱动上的旧表。
+        """
+        with cls._registries_lock:
+            registry = getattr(browser, '_mcp_tab_registry', None)
+            if registry is None or registry.driver is not browser._driver:
+                registry = browser._mcp_tab_registry = cls(browser)
+            return registry
+
+    @staticmethod
+    def _chain(driver, event: str, handler):
+        """DrissionPage 每个事件只保留一个回调, 这里把浏览器自己注册的回调串在后面, 避免覆盖。"""
+        previous = getattr(driver, 'event_handlers', {}).get(event)
+        if previous is None:
+            return handler
+
+        def chained(**kwargs):
+            handler(**kwargs)
+            previous(**kwargs)
+        return chained
+
+    # --- 事件处理 ---
+
+    def _update(self, info: Dict[str, Any], activity: bool = False):
+        """
+        与 Chromium.tab_ids 的筛选一致: 只保留 page / webview, 跳过 devtools:// 窗口。
+        activity 为 True 时 (新建、被附加或被激活) 把标签页移到最新。
+        """
+        tab_id = info['targetId']
+        with self._lock:
+            if info.get('type') not in ('page', 'webview') or info.get('url', '').startswith('devtools://'):
+                self._tabs.pop(tab_id, None)
+                self._attached.pop(tab_id, None)
+                return
+            row = self._tabs.setdefault(tab_id, {"tab_id": tab_id})
+            row.update(title=info.get('title', ''), url=info.get('url', ''))
+            self._attached[tab_id] = info.get('attached', False)
+            if activity:
+                self._tabs.move_to_end(tab_id)
+
+    def _on_created(self, **kwargs):
+        self._update(kwargs['targetInfo'], activity=True)
+
+    def _on_changed(self, **kwargs):
+        info = kwargs['targetInfo']
+        with self._lock:
+            row = self._tabs.get(info['targetId'])
+            was_attached = self._attached.get(info['targetId'], False)
+            same_page = row is not None and (row['title'], row['url']) == (info.get('title', ''), info.get('url', ''))
+        # 变为 attached, 或标题、URL 都没变的通知 (用户切换标签页、window.focus 等激活) 视为被使用; 变为 detached 的不算
+        attached = info.get('attached', False)
+        self._update(info, activity=row is not None and attached and (not was_attached or same_page))
+
+    def _on_destroyed(self, **kwargs):
+        with self._lock:
+            self._tabs.pop(kwargs.get('targetId'), None)
+            self._attached.pop(kwargs.get('targetId'), None)
+
+    # --- 查询 ---
+
+    def touch(self, tab_id: str):
+        """标记标签页为最新 (例如被激活或被本程序打开时)。"""
+        with self._lock:
+            if tab_id in self._tabs:
+                self._tabs.move_to_end(tab_id)
+
+    def latest_id(self) -> Optional[str]:
+        with self._lock:
+            return next(reversed(self._tabs), None)
+
+    def get(self, tab_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._tabs.get(tab_id)
+            return dict(row) if row else None
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._tabs)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(row) for row in self._tabs.values()]
+
+    def __len__(self) -> int:
+        return len(self._tabs)
@@ -4,6 +4,10 @@
 import sqlite3
 import json
 import os
+import re
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
 
 def save_dict_to_sqlite(data, db_path='data.db', table_name='my_table'):
     """
@@ -51,3 +55,48 @@ def save_dict_to_sqlite(data, db_path='data.db', table_name='my_table'):
     conn.close()
 
     return (f"数据已保存到 {db_path} 的表 {table_name} 中。")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        # 支持 "Range: bytes=N-" 和按 Last-Modified 比较的 If-Range, 用于测试断点续传
+        match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range', ''))
+        path = self.translate_path(self.path)
+        if not match or not os.path.isfile(path):
+            return super().send_head()
+        last_modified = self.date_time_string(int(os.path.getmtime(path)))
+        if self.headers.get('If-Range', last_modified) != last_modified:
+            return super().send_head()
+        start, size = int(match.group(1)), os.path.getsize(path)
+        if start >= size:
+            self.send_error(416, "Requested Range Not Satisfiable")
+            return None
+        f = open(path, 'rb')
+        f.seek(start)
+        self.send_response(206)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Range", f"bytes {start}-{size - 1}/{size}")
+        self.send_header("Content-Length", str(size - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Last-Modified", last_modified)
+        self.end_headers()
+        return f
+
+
+def serve_directory(directory='fixtures', port=0):
+    """
+    在后台线程中用本地 HTTP 服务提供一个目录 (默认 fixtures/), 用于离线测试和基准测试。
+
+    参数:
+        directory (str): 要提供的目录。
+        port (int): 端口, 0 表示自动分配。
+    返回:
+        (server, base_url): 用完后调用 server.shutdown() 关闭。
+    """
+    handler = partial(_QuietHandler, directory=os.path.abspath(directory))
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import gzip
+import time
+import base64
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, parse_qsl
+from urllib.request import pathname2url
+
+# CDP Response.protocol -> HAR httpVersion
+HTTP_VERSIONS = {'http/0.9': 'HTTP/0.9', 'http/1.0': 'HTTP/1.0', 'http/1.1': 'HTTP/1.1', 'h2': 'HTTP/2', 'h3': 'HTTP/3'}
+
+
+class TrafficArchive:
+    """
+    把监听到的数据包以 HAR entry 的形式流式写入磁盘, 内存占用与抓包数量无关。
+
+    - 段文件: seg-00001.jsonl.gz ...; 每条记录单独压缩为一个 gzip member 追加写入,
+      整个段仍是合法的 .gz 文件 (可直接 zcat), 同时可以按偏移量只解压单条记录
+    - 轮转: 段文件超过 max_segment_bytes 后新建下一段; 超过 max_segments 时删除最早的段及其索引
+    - 索引: index.db (SQLite), 记录 URL、方法、状态码、MIME、段号、偏移量和长度, 查询和取响应体都无需扫描段文件
+    - read_only=True 时只读打开已有归档 (查询、取响应体、导出), 不创建目录和段文件
+    """
+    def __init__(self, directory: str, body_cap: int = 256 * 1024,
+                 max_segment_bytes: int = 64 * 1024 * 1024, max_segments: int = 0, read_only: bool = False):
+        self.directory = directory
+        self.body_cap = body_cap
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segments = max_segments
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        index_path = os.path.join(directory, 'index.db')
+        if read_only:
+            self._conn = sqlite3.connect(f"file:{pathname2url(index_path)}?mode=ro", uri=True, check_same_thread=False)
+            self._file = None
+            return
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(index_path, check_same_thread=False)
+        self._conn.execute('''CREATE TABLE IF NOT EXISTS packets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL, method TEXT, url TEXT, status INTEGER,
+            mime TEXT, resource_type TEXT, body_size INTEGER, segment INTEGER, offset INTEGER, length INTEGER)''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_url ON packets (url)')
+        self._conn.commit()
+        last = self._conn.execute('SELECT MAX(segment) FROM packets').fetchone()[0]
+        self._segment = last or 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"seg-{segment:05d}.jsonl.gz")
+
+    # --- 写入 ---
+
+    def _to_har_entry(self, packet) -> dict:
+        """把 DrissionPage 的 DataPacket 转换为 HAR 1.2 entry, 响应体超过 body_cap 时截断。"""
+        response = packet.response
+        content: Dict[str, Any] = {"size": 0, "mimeType": ''}
+        timings, total_time = {"send": 0, "wait": 0, "receive": 0}, -1
+        if response:
+            body = response.body
+            if isinstance(body, (dict, list)):
+                text, encoding = json.dumps(body, ensure_ascii=False), None
+            elif isinstance(body, bytes):
+                text, encoding = base64.b64encode(body[:self.body_cap]).decode('ascii'), 'base64'
+            else:
+                text, encoding = str(body or ''), None
+            size = len(body) if isinstance(body, bytes) else len(text.encode('utf-8'))
+            content = {"size": size, "mimeType": response.mimeType or ''}
+            if encoding:
+                content["encoding"] = encoding
+            elif size > self.body_cap:
+                text = text.encode('utf-8')[:self.body_cap].decode('utf-8', errors='ignore')
+            content["text"] = text
+            content["truncated"] = size > self.body_cap
+            timing = response.timing or {}
+            if timing:
+                timings = {
+                    "dns": round(timing.get('dnsEnd', -1) - timing.get('dnsStart', 0), 3) if timing.get('dnsStart', -1) >= 0 else -1,
+                    "connect": round(timing.get('connectEnd', -1) - timing.get('connectStart', 0), 3) if timing.get('connectStart', -1) >= 0 else -1,
+                    "send": round(timing.get('sendEnd', 0) - timing.get('sendStart', 0), 3),
+                    "wait": round(timing.get('receiveHeadersEnd', 0) - timing.get('sendEnd', 0), 3),
+                    # 响应体的接收耗时不在 ResourceTiming 中, 监听数据包也不带 loadingFinished 时间
+                    "receive": 0,
+                }
+                total_time = round(timing.get('receiveHeadersEnd', 0), 3)
+
+        headers = lambda h: [{"name": k, "value": str(v)} for k, v in (h or {}).items()]
+        request_headers = {k.lower(): str(v) for k, v in ((packet.request.headers if packet.request else None) or {}).items()}
+        response_headers = {k.lower(): str(v) for k, v in ((response.headers if response else None) or {}).items()}
+        http_version = HTTP_VERSIONS.get((response.protocol or '').lower(), 'HTTP/1.1') if response else 'HTTP/1.1'
+        post_data = str(packet.request.postData) if packet.request and packet.request.postData else None
+        request = {
+            "method": packet.method,
+            "url": packet.url,
+            "httpVersion": http_version,
+            "cookies": [{"name": n.strip(), "value": v} for n, _, v in
+                        (c.partition('=') for c in request_headers.get('cookie', '').split(';') if c.strip())],
+            "headers": headers(packet.request.headers if packet.request else None),
+            "queryString": [{"name": k, "value": v} for k, v in parse_qsl(urlsplit(packet.url).query, keep_blank_values=True)],
+            "headersSize": -1,
+            "bodySize": len(post_data.encode('utf-8')) if post_data is not None else 0,
+        }
+        if post_data is not None:
+            request["postData"] = {"mimeType": request_headers.get('content-type', ''), "text": post_data}
+        # requestWillBeSent 的 wallTime 是请求发出时的时间; 缺失时 (如仅有失败信息的数据包) 退回归档时间
+        wall_time = (getattr(packet, '_raw_request', None) or {}).get('wallTime')
+        started = datetime.fromtimestamp(wall_time, timezone.utc) if wall_time else datetime.now(timezone.utc)
+        return {
+            "startedDateTime": started.isoformat(),
+            "time": total_time,
+            "request": request,
+            "response": {
+                "status": response.status if response else 0,
+                "statusText": (response.statusText or '') if response else (packet.fail_info.errorText if packet.fail_info else ''),
+                "httpVersion": http_version,
+                # CDP 把多个 Set-Cookie 用换行拼成一个值
+                "cookies": [{"name": n.strip(), "value": v} for n, _, v in
+                            (c.split(';', 1)[0].partition('=') for c in response_headers.get('set-cookie', '').split('\n') if c.strip())],
+                "headers": headers(response.headers if response else None),
+                "content": content,
+                "redirectURL": response_headers.get('location', ''),
+                "headersSize": -1,
+                "bodySize": content["size"] if response else -1,
+            },
+            "cache": {},
+            "timings": timings,
+            "_resourceType": packet.resourceType,
+        }
+
+    def add(self, packet) -> int:
+        """写入一个数据包, 返回其索引 ID。"""
+        if self.read_only:
+            raise ValueError(f"Archive '{self.directory}' is opened read-only.")
+        entry = self._to_har_entry(packet)
+        blob = gzip.compress((json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8'))
+        with self._lock:
+            if self._file.tell() + len(blob) > self.max_segment_bytes and self._file.tell() > 0:
+                self._rotate()
+            offset = self._file.tell()
+            self._file.write(blob)
+            self._file.flush()
+            content = entry["response"]["content"]
+            cursor = self._conn.execute(
+                'INSERT INTO packets (ts, method, url, status, mime, resource_type, body_size, segment, offset, length) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (time.time(), entry["request"]["method"], entry["request"]["url"], entry["response"]["status"],
+                 content["mimeType"], entry["_resourceType"], content["size"], self._segment, offset, len(blob)))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def _rotate(self):
+        """切换到下一个段文件, 并按 max_segments 删除最早的段。调用方需持有锁。"""
+        self._file.close()
+        self._segment += 1
+        self._file = open(self._segment_path(self._segment), 'ab')
+        if self.max_segments and self._segment > self.max_segments:
+            oldest = self._segment - self.max_segments
+            self._conn.execute('DELETE FROM packets WHERE segment <= ?', (oldest,))
+            for segment in range(1, oldest + 1):
+                path = self._segment_path(segment)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+            self._conn.close()
+
+    # --- 查询 ---
+
+    def query(self, url_contains: Optional[str] = None, status: Optional[int] = None,
+              mime_contains: Optional[str] = None, limit: int = 50, offset: int = 0) -> List[Dict[str, Any]]:
+        """只查索引, 不读取段文件。"""
+        sql, args = 'SELECT id, method, url, status, mime, resource_type, body_size FROM packets WHERE 1 = 1', []
+        if url_contains:
+            sql += ' AND url LIKE ?'
+            args.append(f"%{url_contains}%")
+        if status is not None:
+            sql += ' AND status = ?'
+            args.append(status)
+        if mime_contains:
+            sql += ' AND mime LIKE ?'
+            args.append(f"%{mime_contains}%")
+        sql += ' ORDER BY id LIMIT ? OFFSET ?'
+        args += [limit, offset]
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        keys = ('id', 'method', 'url', 'status', 'mime', 'resource_type', 'body_size')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM packets').fetchone()[0]
+
+    def get_entry(self, packet_id: int) -> Optional[dict]:
+        """根据索引中的段号和偏移量直接读取并解压单条记录。"""
+        with self._lock:
+            row = self._conn.execute('SELECT segment, offset, length FROM packets WHERE id = ?', (packet_id,)).fetchone()
+        if not row:
+            return None
+        segment, offset, length = row
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return json.loads(gzip.decompress(f.read(length)))
+
+    def export_har(self, path: str, packet_ids: List[int]) -> int:
+        """把指定的记录导出为标准 HAR 文件, 返回导出的条数。"""
+        entries = []
+        for packet_id in packet_ids:
+            entry = self.get_entry(packet_id)
+            if entry:
+                entry["response"]["content"].pop("truncated", None)
+                entries.append(entry)
+        har = {"log": {"version": "1.2", "creator": {"name": "DrissionPageMCP", "version": "0.1.0"}, "entries": entries}}
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(har, f, ensure_ascii=False)
+        return len(entries)
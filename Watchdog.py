@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+import time
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+try:
+    import psutil
+except ImportError:  # 可选依赖, 没有时在 Linux 上读取 /proc
+    psutil = None
+
+
+def process_rss_mb(pid: int) -> Optional[float]:
+    """读取进程常驻内存 (MB), 无法获取时返回 None。"""
+    try:
+        if psutil:
+            return psutil.Process(pid).memory_info().rss / 1024 / 1024
+        with open(f"/proc/{pid}/status", 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except Exception:
+        return None
+    return None
+
+
+class MemoryWatchdog:
+    """
+    后台线程定期检查浏览器资源:
+
+    - 每个标签页的 JS 堆 (Runtime.getHeapUsage) 和浏览器各进程的常驻内存 (SystemInfo.getProcessInfo)
+    - 标签页 JS 堆超过 max_tab_heap_mb, 或进程总内存超过 max_total_rss_mb 时, 按最久未使用的顺序
+      把空闲超过 idle_seconds 的标签页"休眠": 记下 URL 后导航到 about:blank 释放渲染进程。
+      标签页 ID 不变, 同一标签页的 sessionStorage/cookies 也不受影响, 下次使用时由 wake() 自动恢复原 URL
+    - 浏览器连接断开时自动重新启动/接管浏览器
+    所有动作都记录为事件, 供状态工具查询。
+    """
+    def __init__(self, agent, interval: float = 15, max_tab_heap_mb: float = 512,
+                 max_total_rss_mb: float = 4096, idle_seconds: float = 300, max_events: int = 100):
+        self.agent = agent
+        self.interval = interval
+        self.max_tab_heap_mb = max_tab_heap_mb
+        self.max_total_rss_mb = max_total_rss_mb
+        self.idle_seconds = idle_seconds
+        self.events: deque = deque(maxlen=max_events)
+        self.last_sample: Dict[str, Any] = {}
+        # tab_id -> 休眠前的 URL
+        self.discarded: Dict[str, str] = {}
+        self.last_used: Dict[str, float] = {}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def _event(self, kind: str, **details):
+        self.events.append({"time": time.strftime('%H:%M:%S'), "event": kind, **details})
+
+    # --- 生命周期 ---
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._event("started", interval=self.interval)
+
+    def stop(self):
+        self._stop.set()
+        self._event("stopped")
+
+    @property
+    def running(self) -> bool:
+        return bool(self._thread and self._thread.is_alive() and not self._stop.is_set())
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self._event("check_failed", error=str(e))
+
+    # --- 标签页使用记录 ---
+
+    def touch(self, tab_id: str):
+        self.last_used[tab_id] = time.time()
+
+    def forget(self, tab_id: str):
+        """标签页关闭后清理它的记录。"""
+        self.last_used.pop(tab_id, None)
+        with self._lock:
+            self.discarded.pop(tab_id, None)
+
+    def wake(self, tab) -> bool:
+        """标签页被再次使用时恢复休眠前的页面, 返回是否做了恢复。"""
+        with self._lock:
+            url = self.discarded.pop(tab.tab_id, None)
+        if not url:
+            return False
+        tab.get(url)
+        self._event("restored", tab_id=tab.tab_id, url=url)
+        return True
+
+    # --- 采样与处理 ---
+
+    def _browser_alive(self) -> bool:
+        try:
+            self.agent.browser._run_cdp('Browser.getVersion')
+            return True
+        except Exception:
+            return False
+
+    def _sample(self) -> Dict[str, Any]:
+        browser = self.agent.browser
+        tabs = []
+        for tab in self.agent._visible_tabs():
+            if tab.tab_id in self.discarded:
+                continue
+            try:
+                heap = tab.run_cdp('Runtime.getHeapUsage')
+                tabs.append({"tab_id": tab.tab_id, "heap_mb": round(heap['usedSize'] / 1024 / 1024, 1), "tab": tab})
+            except Exception as e:
+                self._event("tab_unresponsive", tab_id=tab.tab_id, error=str(e))
+
+        processes, total_rss = [], 0.0
+        try:
+            for info in browser._run_cdp('SystemInfo.getProcessInfo')['processInfo']:
+                rss = process_rss_mb(info['id'])
+                if rss is not None:
+                    total_rss += rss
+                processes.append({"pid": info['id'], "type": info['type'],
+                                  "rss_mb": round(rss, 1) if rss is not None else None})
+        except Exception:
+            pass
+        return {"tabs": tabs, "processes": processes, "total_rss_mb": round(total_rss, 1)}
+
+    def _discard(self, tab, reason: str):
+        url = tab.url
+        if not url or url.startswith('about:'):
+            return
+        with self._lock:
+            self.discarded[tab.tab_id] = url
+        tab.get('about:blank')
+        self._event("discarded", tab_id=tab.tab_id, url=url, reason=reason)
+
+    def check(self):
+        """执行一次检查, 必要时休眠标签页或重连浏览器。"""
+        if not self.agent.browser:
+            return
+        if not self._browser_alive():
+            self._event("browser_lost")
+            self.agent._reconnect_browser()
+            with self._lock:
+                self.discarded.clear()
+            self._event("browser_reconnected")
+            return
+
+        sample = self._sample()
+        now = time.time()
+        # 没经过本程序的标签页 (刚新建、用户自己打开) 从第一次被采样到时开始计算空闲时间
+        for t in sample["tabs"]:
+            self.last_used.setdefault(t["tab_id"], now)
+        idle = sorted(
+            (t for t in sample["tabs"] if now - self.last_used.get(t["tab_id"], 0) > self.idle_seconds),
+            key=lambda t: self.last_used.get(t["tab_id"], 0))
+
+        for t in idle:
+            if t["heap_mb"] > self.max_tab_heap_mb:
+                self._discard(t["tab"], f"heap {t['heap_mb']}MB > {self.max_tab_heap_mb}MB")
+        total = sample["total_rss_mb"]
+        for t in idle:
+            if total <= self.max_total_rss_mb:
+                break
+            if t["tab_id"] not in self.discarded:
+                self._discard(t["tab"], f"total rss {total}MB > {self.max_total_rss_mb}MB")
+                total = self._sample()["total_rss_mb"]
+
+        self.last_sample = {
+            "time": time.strftime('%H:%M:%S'),
+            "tabs": [{k: v for k, v in t.items() if k != 'tab'} for t in sample["tabs"]],
+            "processes": sample["processes"],
+            "total_rss_mb": sample["total_rss_mb"],
+        }
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "limits": {"max_tab_heap_mb": self.max_tab_heap_mb, "max_total_rss_mb": self.max_total_rss_mb,
+                       "idle_seconds": self.idle_seconds, "interval": self.interval},
+            "last_sample": self.last_sample,
+            "discarded_tabs": dict(self.discarded),
+            "events": list(self.events),
+        }
@@ -4,10 +4,12 @@ import sys,os
 # 将脚本所在的目录添加到 Python 的模块搜索路径中
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 import json
+import argparse
 import pandas as pd
 import inspect
 import uuid
-from typing import Any, Literal, List, Dict, Optional, Union, Annotated
+import ipaddress
+from typing import Any, Callable, Literal, List, Dict, Optional, Union, Annotated
 
 # DrissionPage and MCP imports
 from DrissionPage import Chromium, ChromiumOptions
@@ -17,13 +19,16 @@ from mcp.server.fastmcp import FastMCP
 from pydantic import Field
 
 # Placeholder for your custom JS module
-from CodeBox import domTreeToJson
+from CodeBox import domTreeToJson, locatorIndex, fillFields, storageSnapshot, storageRestore
 # Other imports
 from PIL import Image as PILImage
 import base64
 import io
 import time
 import os
+import threading
+import contextlib
+from urllib.parse import urljoin
 prompt = '''
 你正在使用一组浏览器控制工具来执行网页自动化任务。请按照以下步骤依次使用这些工具,完全自主完成任务：
 1.  **启动浏览器**: 使用 `connect_or_open_browser` 启动或连接已有的浏览器实例。这是所有操作的前提。
@@ -34,59 +39,260 @@ prompt = '''
 6.  **数据抓取 (可选)**: 如果需要抓取接口数据, 依次使用 `start_network_listening`, `get_network_traffic_summary`
 '''
 from DataPacketSummarizer import DataPacketSummarizer
+from ResponseShaper import ResponseShaper, dom_json_to_outline
+from AXSnapshot import prune_ax_tree
+from SessionRecorder import SessionRecorder
+from ResponseCache import ResponseCache
+from SessionPool import SessionPool
+from TabRegistry import TabRegistry
+from TrafficArchive import TrafficArchive
+from SessionState import SessionStateStore, normalize_origin
+from Profiler import TraceSession
+from ScriptRegistry import ScriptRegistry
+from Watchdog import MemoryWatchdog
+from PageIndex import PageIndex
+from ResourceDownloader import ResourceDownloader
 
 class DrissionPageMCP:
     """
     一个基于 DrissionPage 的 MCP 工具集，用于控制浏览器执行自动化任务。
     """
-    def __init__(self):
+    def __init__(self, browser: Optional[Chromium] = None, isolated: bool = False, data_root: Optional[str] = None):
         """title: 初始化工具集
         description: 初始化 DrissionPageMCP 实例，建立一个浏览器和元素缓存。
+        传入 browser 时复用该浏览器；isolated 为 True 时只能看到和操作本实例打开的标签页 (多客户端共享浏览器时使用)。
+        data_root 不为 None 时，所有落盘数据 (正文索引、登录状态、下载、缓存、抓包归档、trace) 和调用方传入的路径都限制在该目录内。
         """
-        self.browser: Optional[Chromium] = None
-        self.element_cache: Dict[str, ChromiumElement] = {}
+        self.browser: Optional[Chromium] = browser
+        self.data_root: Optional[str] = os.path.abspath(data_root) if data_root else None
+        # 隔离模式下本实例拥有的标签页ID (按打开顺序)，None 表示不做隔离
+        self.owned_tabs: Optional[List[str]] = [] if isolated else None
+        # 值为元素对象，或 (tab, backendDOMNodeId) 形式的延迟引用 (由 get_ax_snapshot 产生，首次使用时解析)
+        self.element_cache: Dict[str, Union[ChromiumElement, tuple]] = {}
         self.network_events: List[Dict] = []
         self.summarizer = DataPacketSummarizer()
+        self.shaper = ResponseShaper()
+        # 每个标签页第一次被使用时依次调用的钩子 (如录制/回放流量拦截)，参数为 tab 对象
+        self.tab_hooks: List[Callable[[ChromiumTab], None]] = []
+        self._prepared_tabs: set = set()
+        self.response_cache: Optional[ResponseCache] = None
+        # 持久化抓包: 归档目录(绝对路径) -> TrafficArchive；tab_id -> (归档, 写入线程, 停止信号)
+        self.traffic_archives: Dict[str, TrafficArchive] = {}
+        self._streaming: Dict[str, tuple] = {}
+        self.session_store = SessionStateStore(self._data_path('Profiles'))
+        # 待写入的 sessionStorage: tab_id -> {origin: (注入脚本 identifier, 页面内标记键)}，脚本生效后移除
+        self._session_restores: Dict[str, Dict[str, tuple]] = {}
+        # 性能分析模式：不为 None 时 get / run_javascript 会录制 trace 并保存到该目录
+        self.trace_dir: Optional[str] = None
+        # 预装到页面、按名字调用的脚本，常用的内置脚本在这里注册
+        self.scripts = ScriptRegistry()
+        self.scripts.register('domTreeToJson', domTreeToJson, builtin=True)
+        self.watchdog: Optional[MemoryWatchdog] = None
+        self._browser_config: dict = {'debug_port': 9222}
+        # 共享浏览器模式下由 SessionPool 设置：重连时由会话池重建一次共享浏览器并更新所有会话，参数为已失效的浏览器
+        self.reconnect_handler: Optional[Callable[[Chromium], None]] = None
+        # get_visible_text 提取结果的全文索引，第一次使用时创建 (Web_info/pages.db)
+        self.page_index: Optional[PageIndex] = None
+        # 资源下载: 目录(绝对路径) -> ResourceDownloader，复用连接池和去重索引
+        self.downloaders: Dict[str, ResourceDownloader] = {}
 
-    def _get_tab(self, tab_id: str) -> Optional[ChromiumTab]:
-        """内部辅助函数，根据 tab_id 获取标签页对象，支持 'current' 别名。"""
+    def _data_path(self, path: str) -> str:
+        """内部辅助函数，把落盘路径解析为绝对路径；设置了 data_root 时相对于它解析，越出该目录的路径抛出 ValueError。"""
+        if self.data_root is None:
+            return os.path.abspath(path)
+        root = os.path.realpath(self.data_root)
+        resolved = os.path.realpath(os.path.join(root, path))
+        if os.path.commonpath([root, resolved]) != root:
+            raise ValueError(f"Path '{path}' is outside of the session data directory.")
+        return resolved
+
+    def _get_tab(self, tab_id: str, wake: bool = True) -> Optional[ChromiumTab]:
+        """内部辅助函数，根据 tab_id 获取标签页对象，支持 'current' 别名。wake 为 False 时不恢复被休眠的页面。"""
         if not self.browser:
-            print("[!] 浏览器未初始化")
+            print("[!] 浏览器未初始化", file=sys.stderr)
             return None
+        if self.owned_tabs is not None:
+            if tab_id == "current":
+                tab_id = self.owned_tabs[-1] if self.owned_tabs else None
+            if tab_id not in self.owned_tabs:
+                return None
+            return self._prepare_tab(self.browser.get_tab(tab_id), wake)
         if tab_id == "current":
-            return self.browser.latest_tab
-        return self.browser.get_tab(tab_id)
+            latest_id = self._registry().latest_id()
+            tab = self.browser.get_tab(latest_id) if latest_id else self.browser.latest_tab
+        else:
+            tab = self.browser.get_tab(tab_id)
+        return self._prepare_tab(tab, wake)
+
+    def _registry(self) -> TabRegistry:
+        """内部辅助函数，返回当前浏览器的标签页元数据表 (由 Target 事件维护，查询无需 CDP 往返)。"""
+        return TabRegistry.for_browser(self.browser)
+
+    def _reconnect_browser(self):
+        """内部辅助函数，浏览器断开后按上次的配置重新启动/接管；共享浏览器模式下交给会话池统一重建。"""
+        if self.reconnect_handler:
+            self.reconnect_handler(self.browser)
+        else:
+            self._reset_browser(self._create_browser(self._browser_config))
+
+    def _reset_browser(self, browser: Chromium):
+        """内部辅助函数，切换到新的浏览器对象，并清理与旧浏览器相关的状态。"""
+        self.browser = browser
+        self.element_cache.clear()
+        self._prepared_tabs.clear()
+        self._session_restores.clear()
+        if self.owned_tabs is not None:
+            self.owned_tabs.clear()
+        if self.watchdog:
+            self.watchdog.discarded.clear()
+
+    def _owned_tab(self) -> Optional[ChromiumTab]:
+        """内部辅助函数，返回本实例当前的标签页 (不存在时为 None)。"""
+        return self._get_tab("current") if self.owned_tabs else None
+
+    def _visible_tabs(self) -> List[ChromiumTab]:
+        """内部辅助函数，返回本实例可见的标签页：隔离模式下为自己拥有的，否则为全部。"""
+        if self.owned_tabs is not None:
+            return [self.browser.get_tab(tid) for tid in self.owned_tabs]
+        return self.browser.get_tabs() # 使用 get_tabs() 方法
+
+    def _adopt_tab(self, tab: ChromiumTab) -> ChromiumTab:
+        """内部辅助函数，隔离模式下把标签页登记为本实例所有，并设为 'current'。"""
+        if self.owned_tabs is not None:
+            if tab.tab_id in self.owned_tabs:
+                self.owned_tabs.remove(tab.tab_id)
+            self.owned_tabs.append(tab.tab_id)
+        self._registry().touch(tab.tab_id)
+        return tab
+
+    @staticmethod
+    def _create_browser(config: dict) -> Chromium:
+        """内部辅助函数，根据配置字典启动或接管浏览器。"""
+        co = ChromiumOptions()
+        if debug_port := config.get("debug_port"):
+            co.set_local_port(debug_port)
+        if browser_path := config.get("browser_path"):
+            co.set_browser_path(browser_path)
+        if user_data_path := config.get("user_data_path"):
+            co.set_user_data_path(user_data_path)
+        if config.get("headless", False):
+            co.headless(True)
+        return Chromium(co)
+
+    def _prepare_tab(self, tab: Optional[ChromiumTab], wake: bool = True) -> Optional[ChromiumTab]:
+        """内部辅助函数，对首次见到的标签页执行 tab_hooks；开启看门狗时记录使用时间并恢复被休眠的页面。"""
+        if tab and self.watchdog:
+            self.watchdog.touch(tab.tab_id)
+            if wake:
+                self.watchdog.wake(tab)
+        if tab and self._session_restores.get(tab.tab_id):
+            self._finish_session_restore(tab)
+        if tab and self.tab_hooks and tab.tab_id not in self._prepared_tabs:
+            self._prepared_tabs.add(tab.tab_id)
+            for hook in self.tab_hooks:
+                try:
+                    hook(tab)
+                except Exception as e:
+                    print(f"[!] Warning: Tab hook failed on {tab.tab_id}: {e}", file=sys.stderr)
+        return tab
+
+    def _finish_session_restore(self, tab: ChromiumTab):
+        """内部辅助函数，恢复 sessionStorage 的注入脚本在当前站点生效后，移除脚本和页面内的标记。"""
+        pending = self._session_restores[tab.tab_id]
+        url = tab.url
+        origin = normalize_origin(url) if url.startswith('http') else None
+        entry = pending.get(origin)
+        if not entry:
+            return
+        identifier, marker = entry
+        try:
+            applied = tab.run_js(f"const applied = sessionStorage.getItem({json.dumps(marker)}) !== null;"
+                                 f" sessionStorage.removeItem({json.dumps(marker)}); return applied;")
+            if applied:
+                tab.run_cdp('Page.removeScriptToEvaluateOnNewDocument', identifier=identifier)
+                pending.pop(origin)
+        except Exception as e:
+            print(f"[!] Warning: Failed to clean up session restore on {tab.tab_id}: {e}", file=sys.stderr)
+
+    def _get_element(self, element_id: str) -> Optional[ChromiumElement]:
+        """内部辅助函数，从缓存取出元素，延迟引用会在此时解析为元素对象并回写缓存。"""
+        element = self.element_cache.get(element_id)
+        if isinstance(element, tuple):
+            tab, backend_id = element
+            element = ChromiumElement(tab, backend_id=backend_id)
+            self.element_cache[element_id] = element
+        return element
 
     def get_domTreeToJson(
         self, 
-        tab_id: Annotated[str, Field(description="目标标签页的ID，可传入 'current' 代表当前活动标签页。")] = "current"
-    ) -> dict:
+        tab_id: Annotated[str, Field(description="目标标签页的ID，可传入 'current' 代表当前活动标签页。")] = "current",
+        output_format: Annotated[Literal['outline', 'json'], Field(description="(可选)返回格式, 'outline' (缩进大纲, 更紧凑) 或 'json' (嵌套JSON)，默认为 'outline'。")] = "outline"
+    ) -> Union[str, dict]:
         """title: 获取页面的 DOM 结构
-        description: 获取指定标签页的完整 DOM 结构，并以 JSON 格式返回。这对于分析页面布局和定位元素至关重要。
+        description: 获取指定标签页的完整 DOM 结构，以缩进大纲或 JSON 格式返回。这对于分析页面布局和定位元素至关重要。
         """
         tab = self._get_tab(tab_id)
         if not tab:
             return {"error": f"Tab '{tab_id}' not found."}
         
-        page_tree = tab.run_js(domTreeToJson)
+        try:
+            page_tree = self.scripts.call(tab, 'domTreeToJson')
+        except Exception as e:
+            return {"error": f"Failed to get DOM tree: {e}"}
+        if output_format == 'outline':
+            return dom_json_to_outline(page_tree)
         return page_tree
 
+    def get_ax_snapshot(
+        self,
+        tab_id: Annotated[str, Field(description="目标标签页的ID，可传入 'current' 代表当前活动标签页。")] = "current",
+        max_depth: Annotated[int, Field(description="(可选)输出大纲的最大层级，默认为 30。")] = 30,
+        max_nodes: Annotated[int, Field(description="(可选)最多输出的节点数量，默认为 500。")] = 500
+    ) -> dict:
+        """title: 获取页面的无障碍树快照
+        description: 获取页面的无障碍树 (角色+名称) 并裁剪为紧凑大纲，通常比 DOM 结构小得多。可交互节点带有 [element_id]，可直接用于 click、input_text 等工具。
+        """
+        tab = self._get_tab(tab_id)
+        if not tab:
+            return {"error": f"Tab '{tab_id}' not found."}
+
+        try:
+            nodes = tab.run_cdp('Accessibility.getFullAXTree')['nodes']
+        except Exception as e:
+            return {"error": f"Failed to get accessibility tree: {e}"}
+
+        lines, handles, stats = prune_ax_tree(nodes, max_depth=max_depth, max_nodes=max_nodes,
+                                              id_prefix=f"ax-{tab.tab_id[-4:]}-")
+        for element_id, backend_id in handles.items():
+            self.element_cache[element_id] = (tab, backend_id)
+        return {"snapshot": "\n".join(lines), **stats}
+
+    def read_more(
+        self,
+        cursor: Annotated[str, Field(description="上一次返回结果中被截断部分的续读游标。")]
+    ) -> Union[str, dict]:
+        """title: 继续读取被截断的结果
+        description: 当工具返回结果过长被截断时，使用返回信息中的 cursor 继续读取剩余内容。
+        """
+        try:
+            return self.shaper.resume(cursor)
+        except KeyError as e:
+            return {"error": str(e)}
+
     async def connect_or_open_browser(
         self, 
-        config: Annotated[dict, Field(description="(可选)浏览器配置字典，可以包含 'debug_port', 'browser_path', 'headless' 等。")] = {'debug_port': 9222}
+        config: Annotated[dict, Field(description="(可选)浏览器配置字典，可以包含 'debug_port', 'browser_path', 'user_data_path', 'headless' 等。")] = {'debug_port': 9222}
     ) -> dict:
         """title: 启动或连接浏览器
         description: 打开一个新浏览器或接管一个已存在的浏览器。这是所有浏览器操作的入口点。
         """
-        co = ChromiumOptions()
-        if debug_port := config.get("debug_port"):
-            co.set_local_port(debug_port)
-        if browser_path := config.get("browser_path"):
-            co.set_browser_path(browser_path)
-        if config.get("headless", False):
-            co.headless(True)
-        self.browser = Chromium(co)
-        tab = self.browser.latest_tab or self.browser.new_tab()
+        if self.owned_tabs is not None and self.browser:
+            # 共享浏览器模式：不重新连接，只为本会话打开一个独立的标签页
+            tab = self._owned_tab() or self._prepare_tab(self._adopt_tab(self.browser.new_tab()))
+            return {"tab_id": tab.tab_id, "title": tab.title, "url": tab.url}
+        self._browser_config = config
+        self.browser = self._create_browser(config)
+        tab = self._prepare_tab(self._adopt_tab(self.browser.latest_tab or self.browser.new_tab()))
         return {"tab_id": tab.tab_id, "title": tab.title, "url": tab.url}
 
     async def get(
@@ -107,14 +313,18 @@ class DrissionPageMCP:
         
         try:
             # DrissionPage 的 get 方法是同步的，但在异步函数中可以 await
-            tab.get(url)
+            with self._profiled(tab, 'get') as trace:
+                tab.get(url)
             
-            return {
+            result = {
                 "status": "success",
                 "tab_id": tab.tab_id,
                 "title": tab.title,
                 "url": tab.url
             }
+            if trace:
+                result["profile"] = trace.summary
+            return result
         except Exception as e:
             return {"error": f"导航到 {url} 失败: {e}"}
 
@@ -125,23 +335,25 @@ class DrissionPageMCP:
         if not self.browser:
             return []
         
-        tab_list = []
-        all_tabs = self.browser.get_tabs() # 使用 get_tabs() 方法
-        active_tab = self.browser.latest_tab
+        # 直接读取由 Target 事件维护的元数据表，不再逐个标签页查询标题和URL；与 get_tabs() 一致，最新的排在最前
+        registry = self._registry()
+        if self.owned_tabs is not None:
+            rows = [row for row in map(registry.get, reversed(self.owned_tabs)) if row]
+            active_id = self.owned_tabs[-1] if self.owned_tabs else None
+        else:
+            rows = registry.rows()[::-1]
+            active_id = registry.latest_id()
 
-        for i, tab in enumerate(all_tabs):
-            try:
-                tab_info = {
-                    "index": i + 1,
-                    "tab_id": tab.tab_id,
-                    "title": tab.title,
-                    "url": tab.url,
-                    "is_active": tab == active_tab,
-                }
-                tab_list.append(tab_info)
-            except Exception as e:
-                print(f"[!] Warning: Failed to get info for a tab, skipping. Error: {e}")
-        return tab_list
+        return [
+            {
+                "index": i + 1,
+                "tab_id": row["tab_id"],
+                "title": row["title"],
+                "url": row["url"],
+                "is_active": row["tab_id"] == active_id,
+            }
+            for i, row in enumerate(rows)
+        ]
 
     async def new_tab(
         self, 
@@ -153,7 +365,12 @@ class DrissionPageMCP:
         # await self.connect_or_open_browser()
         # if not self.browser:
         #     await self.connect_or_open_browser()
-        tab = self.browser.new_tab(url)
+        if self.tab_hooks:
+            # 先打开空白页执行钩子，保证首次加载的流量也能被拦截
+            tab = self._prepare_tab(self._adopt_tab(self.browser.new_tab()))
+            tab.get(url)
+        else:
+            tab = self._adopt_tab(self.browser.new_tab(url))
         return {"tab_id": tab.tab_id, "title": tab.title, "url": tab.url}
 
     def close_tab(
@@ -163,9 +380,15 @@ class DrissionPageMCP:
         """title: 关闭标签页
         description: 根据 tab_id 关闭指定的标签页。任务完成后，建议关闭不再需要的标签页以释放资源。
         """
-        tab = self._get_tab(tab_id)
+        # 被休眠的标签页马上就要关闭，不必先恢复页面
+        tab = self._get_tab(tab_id, wake=False)
         if tab:
+            if self.owned_tabs is not None:
+                self.owned_tabs.remove(tab.tab_id)
             tab.close()
+            self.scripts.forget_tab(tab.tab_id)
+            if self.watchdog:
+                self.watchdog.forget(tab.tab_id)
             self.clear_element_cache() 
             return True
         return False
@@ -189,6 +412,41 @@ class DrissionPageMCP:
         tab.actions.type(key_map[key])
         return {"status": "success", "action": "send_key", "key": key}
 
+    def _iter_contexts(self, context, depth: int = 0, max_depth: int = 5):
+        """内部辅助函数，依次返回页面本身及其所有 (含跨域、嵌套) iframe 对象。"""
+        yield context
+        if depth >= max_depth:
+            return
+        try:
+            frames = context.get_frames(timeout=0)
+        except Exception as e:
+            print(f"[!] Warning: Failed to enumerate frames, skipping. Error: {e}", file=sys.stderr)
+            return
+        for frame in frames:
+            yield from self._iter_contexts(frame, depth + 1, max_depth)
+
+    def _locate(self, tab: ChromiumTab, by: str, value: str, limit: int, timeout: float = 5) -> List[tuple]:
+        """
+        内部辅助函数，借助页内定位索引在主文档、所有 iframe 和 shadow root 中一次性查找元素。
+        返回 [(元素, 所在frame的url或None), ...]，未找到时在 timeout 内轮询重试。
+        """
+        deadline = time.time() + timeout
+        while True:
+            found = []
+            for context in self._iter_contexts(tab):
+                try:
+                    elements = context.run_js(locatorIndex, by, value, limit - len(found)) or []
+                except Exception as e:
+                    print(f"[!] Warning: Locator index failed in a frame, skipping. Error: {e}", file=sys.stderr)
+                    continue
+                frame_url = None if context is tab else context.url
+                found.extend((ele, frame_url) for ele in elements if isinstance(ele, ChromiumElement))
+                if len(found) >= limit:
+                    return found
+            if found or time.time() >= deadline:
+                return found
+            time.sleep(0.3)
+
     def find_element(
         self, 
         tab_id: Annotated[str, Field(description="目标标签页的ID, 可传入 'current'。")], 
@@ -196,22 +454,21 @@ class DrissionPageMCP:
         value: Annotated[str, Field(description="定位策略对应的值。")]
     ) -> dict:
         """title: 查找单个元素
-        description: 在指定标签页中通过 CSS选择器 或 模糊文本匹配 查找单个元素，并将其ID存入缓存以便后续操作。
+        description: 在指定标签页中通过 CSS选择器 或 模糊文本匹配 查找单个元素，会同时搜索所有 iframe (含跨域) 和 shadow DOM，并将其ID存入缓存以便后续操作。
         """
         tab = self._get_tab(tab_id)
         if not tab:
             return {"error": f"Tab with id '{tab_id}' not found."}
-        # 如果是精确文本匹配，使用 'accurate' 定位
-        if by == 'accurate':
-            locator = f'text={value}'
-        else:
-            locator = f'{by}:{value}'
 
-        element = tab.ele(locator, timeout=5)
-        if element:
+        found = self._locate(tab, by, value, limit=1)
+        if found:
+            element, frame_url = found[0]
             element_id = f"elem-{uuid.uuid4()}"
             self.element_cache[element_id] = element
-            return {"element_id": element_id, 'texts': element.texts(), 'html': element.html}
+            result = {"element_id": element_id, 'texts': element.texts(), 'html': element.html}
+            if frame_url:
+                result["frame_url"] = frame_url
+            return result
         
         raise Exception(f"Element not found by '{by}' with value '{value}'")
 
@@ -219,28 +476,31 @@ class DrissionPageMCP:
         self, 
         tab_id: Annotated[str, Field(description="目标标签页的ID, 可传入 'current'。")], 
         by: Annotated[Literal['css', 'text'], Field(description="定位策略, 'css' (CSS选择器) 或 'text' (模糊文本匹配)。")], 
-        value: Annotated[str, Field(description="定位策略对应的值。")]
+        value: Annotated[str, Field(description="定位策略对应的值。")],
+        limit: Annotated[int, Field(description="(可选)最多返回的元素数量，默认为 100。")] = 100
     ) -> dict:
         """title: 查找多个元素
-        description: 在指定标签页中查找所有匹配的元素，并返回它们的 element_id 列表和对应的文本。
+        description: 在指定标签页 (含所有 iframe 和 shadow DOM) 中查找所有匹配的元素，并返回它们的 element_id 列表和对应的文本。
         """
         tab = self._get_tab(tab_id)
         if not tab:
             return {"error": f"Tab with id '{tab_id}' not found."}
         
-        locator = f'text:{value}' if by == 'text' else f'css:{value}'
-        elements = tab.eles(locator, timeout=5)
-        if not elements:
+        found = self._locate(tab, by, value, limit=limit)
+        if not found:
             raise Exception(f"No elements found by '{by}' with value '{value}'")
         
         results = []
-        for ele in elements:
+        for ele, frame_url in found:
             element_id = f"elem-{uuid.uuid4()}"
             self.element_cache[element_id] = ele
-            results.append({
+            item = {
                 "element_id": element_id,
                 "texts": ele.texts()
-            })
+            }
+            if frame_url:
+                item["frame_url"] = frame_url
+            results.append(item)
         return {"elements": results}
 
     def run_javascript(
@@ -256,11 +516,73 @@ class DrissionPageMCP:
             return {"error": f"Tab '{tab_id}' not found."}
         
         try:
-            result = tab.run_js(js_script)
+            with self._profiled(tab, 'run_javascript') as trace:
+                result = tab.run_js(js_script)
+            if trace:
+                return {"result": result, "profile": trace.summary}
             return {"result": result}
         except Exception as e:
             return {"error": f"JavaScript execution failed: {e}"}
 
+    def register_script(
+        self,
+        name: Annotated[str, Field(description="脚本名称，之后用 call_script 按名字调用。")],
+        js_script: Annotated[str, Field(description="JavaScript 函数体，与 run_javascript 写法相同：用 `return` 返回结果，参数通过 arguments[0]、arguments[1]... 获取。")]
+    ) -> dict:
+        """title: 注册可复用脚本
+        description: 注册一段需要反复执行的 JavaScript。脚本会预装到页面中并在导航后自动保留，之后用 call_script 按名字和参数调用，无需每次重新发送整段代码。
+        """
+        self.scripts.register(name, js_script, tabs=self._visible_tabs() if self.browser else None)
+        return {"status": "success", "name": name, "bytes": len(js_script.encode('utf-8'))}
+
+    def call_script(
+        self,
+        name: Annotated[str, Field(description="已注册的脚本名称。")],
+        args: Annotated[Optional[List[Any]], Field(description="(可选)传给脚本的参数列表，对应 arguments[0]、arguments[1]...。")] = None,
+        tab_id: Annotated[str, Field(description="目标标签页的ID, 可传入 'current'。")] = "current"
+    ) -> dict:
+        """title: 调用已注册脚本
+        description: 按名字调用 register_script 注册过的脚本并返回结果。参数和返回值都有大小限制，超出时返回错误。
+        """
+        tab = self._get_tab(tab_id)
+        if not tab:
+            return {"error": f"Tab '{tab_id}' not found."}
+        try:
+            with self._profiled(tab, f'script-{name}') as trace:
+                result = self.scripts.call(tab, name, args)
+            if trace:
+                return {"result": result, "profile": trace.summary}
+            return {"result": result}
+        except Exception as e:
+            return {"error": f"Script '{name}' failed: {e}"}
+
+    def list_scripts(self) -> List[Dict[str, Any]]:
+        """title: 列出已注册脚本
+        description: 列出所有可通过 call_script 调用的脚本名称及大小，包括内置脚本。
+        """
+        return self.scripts.list()
+
+    def _profiled(self, tab: ChromiumTab, label: str):
+        """内部辅助函数，性能分析模式下返回 TraceSession，否则返回空的上下文管理器 (as 得到 None)。"""
+        if self.trace_dir:
+            return TraceSession(tab, self.trace_dir, label)
+        return contextlib.nullcontext()
+
+    def set_profiling(
+        self,
+        enabled: Annotated[bool, Field(description="是否开启性能分析模式。")] = True,
+        trace_dir: Annotated[str, Field(description="(可选)trace 文件保存目录，默认为 'Traces'。")] = "Traces"
+    ) -> dict:
+        """title: 开关性能分析模式
+        description: 开启后 get 和 run_javascript 会额外返回 profile 摘要 (脚本、布局、网络等待耗时和 JS 堆变化)，并保存可在 Chrome DevTools 性能面板中打开的 trace 文件。用于排查页面加载或脚本执行慢的原因。
+        """
+        try:
+            trace_dir = self._data_path(trace_dir)
+        except ValueError as e:
+            return {"error": str(e)}
+        self.trace_dir = trace_dir if enabled else None
+        return {"status": "success", "profiling": enabled, "trace_dir": trace_dir if enabled else None}
+
     def clear_element_cache(self) -> str:
         """title: 清空元素缓存
         description: 清除所有已缓存的元素引用。在页面跳转、刷新或关闭后，应调用此函数以避免操作过时元素。
@@ -273,7 +595,8 @@ class DrissionPageMCP:
         """title: 读取元素缓存
         description: 查看所有当前已找到过的元素ID和具体信息
         """
-        return {eid: str(ele) for eid, ele in self.element_cache.items()}
+        return {eid: f"<AXNode backend_id={ele[1]}>" if isinstance(ele, tuple) else str(ele)
+                for eid, ele in self.element_cache.items()}
 
     def click(
         self, 
@@ -282,15 +605,16 @@ class DrissionPageMCP:
         """title: 点击元素 (带反馈)
         description: 点击一个已获取的元素，并返回点击后的页面状态变化（如是否发生跳转）。
         """
-        element = self.element_cache.get(element_id)
+        element = self._get_element(element_id)
         if not element:
             return {"error": f"Element ID '{element_id}' not found in cache."}
         
         try:
             # 1. 获取点击前的页面URL和标签页数量
             tab = self._get_tab('current')
+            registry = self._registry()
             url_before = tab.url
-            tabs_before = len(self.list_tabs())
+            tabs_before = set(registry.ids())
             
             # 2. 执行点击操作
             element.click(by_js=None)
@@ -299,13 +623,17 @@ class DrissionPageMCP:
             time.sleep(0.5) # 这个时间可以根据网络情况微调
             
             # 4. 获取点击后的状态
-            url_after = tab.url
-            tabs_after = len(self.list_tabs())
+            row = registry.get(tab.tab_id)
+            url_after = row["url"] if row else tab.url
+            new_tabs = set(registry.ids()) - tabs_before
+            # 隔离模式下，点击打开的新标签页归属于本实例
+            for new_tab_id in new_tabs:
+                self._adopt_tab(self.browser.get_tab(new_tab_id))
             
             # 5. 组装反馈信息
             feedback = {
                 "url_changed": url_before != url_after,
-                "new_tab_opened": tabs_after > tabs_before,
+                "new_tab_opened": bool(new_tabs),
                 "url_before": url_before,
                 "url_after": url_after,
             }
@@ -324,7 +652,7 @@ class DrissionPageMCP:
         """title: 输入文本
         description: 向一个已获取的元素（通常是输入框）输入文本，并验证输入是否成功。
         """
-        element = self.element_cache.get(element_id)
+        element = self._get_element(element_id)
         if not element:
             return {"error": f"Element ID '{element_id}' not found in cache."}
             
@@ -348,6 +676,73 @@ class DrissionPageMCP:
         except Exception as e:
              return {"error": f"Failed to input text into element {element_id}: {e}"}
 
+    def _run_fill(self, fields: List[tuple], mode: str) -> Dict[str, dict]:
+        """内部辅助函数，按所属页面/frame 分组，每组用一次 JS 调用完成赋值或校验。fields 为 [(键, 元素, 值), ...]。"""
+        groups: Dict[int, List[tuple]] = {}
+        for field in fields:
+            groups.setdefault(id(field[1].owner), []).append(field)
+        results = {}
+        for group in groups.values():
+            keys, elements, values = zip(*group)
+            checks = elements[0].owner.run_js(fillFields, list(values), mode, *elements)
+            results.update(zip(keys, checks))
+        return results
+
+    def fill_form(
+        self,
+        fields: Annotated[Dict[str, Union[str, bool, int, float]], Field(description="要填写的字段映射，键为 element_id 或 DrissionPage 定位符 (如 '#username'、'@name=email')，值为要填入的内容；复选框/单选框传 true/false。")],
+        tab_id: Annotated[str, Field(description="定位符所在的标签页ID, 可传入 'current'。")] = "current"
+    ) -> dict:
+        """title: 批量填写表单
+        description: 一次性填写多个表单字段并统一校验。优先直接设置值并触发 input/change 事件，校验失败的字段会自动改用模拟键盘输入重试。比逐个调用 input_text 快得多。
+        """
+        tab = None
+        resolved, errors = [], {}
+        for key, value in fields.items():
+            element = self._get_element(key)
+            if not element:
+                tab = tab or self._get_tab(tab_id)
+                if not tab:
+                    return {"error": f"Tab '{tab_id}' not found."}
+                element = tab.ele(key, timeout=2)
+            if element:
+                resolved.append((key, element, value))
+            else:
+                errors[key] = "element not found"
+
+        start = time.perf_counter()
+        try:
+            results = self._run_fill(resolved, 'set')
+            for entry in results.values():
+                entry["method"] = "setter"
+
+            # 快速路径未生效的字段 (部分受控组件、输入掩码等) 改用键盘输入
+            retry = []
+            for key, element, value in resolved:
+                if results[key]["ok"] or isinstance(value, bool):
+                    continue
+                try:
+                    element.input(str(value), clear=True)
+                    retry.append((key, element, value))
+                except Exception as e:
+                    # 单个字段输入失败 (元素不可交互、已脱离文档等) 只记在该字段下, 不影响其他字段
+                    results.pop(key)
+                    errors[key] = f"keystroke input failed: {e}"
+            if retry:
+                for key, entry in self._run_fill(retry, 'verify').items():
+                    results[key] = {**entry, "method": "keystroke"}
+        except Exception as e:
+            return {"error": f"Failed to fill form: {e}"}
+
+        fields_report = {key: {"verified": entry["ok"], "actual": entry["actual"], "method": entry["method"]}
+                         for key, entry in results.items()}
+        fields_report.update({key: {"verified": False, "error": err} for key, err in errors.items()})
+        return {
+            "status": "success" if all(f["verified"] for f in fields_report.values()) else "partial",
+            "fields": fields_report,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
     def get_attribute(
         self, 
         element_id: Annotated[str, Field(description="目标元素的唯一ID，通过 find_element 或 find_elements 获取。")], 
@@ -356,7 +751,7 @@ class DrissionPageMCP:
         """title: 获取元素属性
         description: 获取一个已获取元素的指定HTML属性值，如 'href', 'src', 'value', 'class' 等。
         """
-        element = self.element_cache.get(element_id)
+        element = self._get_element(element_id)
         if not element:
             return {"error": f"Element ID '{element_id}' not found in cache."}
         return {"attribute_value": element.attr(attribute_name)}
@@ -368,11 +763,51 @@ class DrissionPageMCP:
         """title: 获取元素截图
         description: 获取单个元素的截图，比如播放按钮、验证码等，用于需要对特定区域进行视觉分析的场景。
         """
-        element = self.element_cache.get(element_id)
+        element = self._get_element(element_id)
         if not element:
             return f"Error: Element ID '{element_id}' not found in cache."
         return element.get_screenshot(as_bytes='jpeg')
 
+    def download_resources(
+        self,
+        urls: Annotated[Optional[List[str]], Field(description="(可选)要下载的资源URL列表，相对地址按当前页面解析。")] = None,
+        selector: Annotated[Optional[str], Field(description="(可选)DrissionPage 定位符 (如 'tag:img'、'css:a.pdf')，下载匹配元素的 src 或 href 指向的资源。")] = None,
+        tab_id: Annotated[str, Field(description="提供 cookies 和请求头的标签页ID, 可传入 'current'。")] = "current",
+        directory: Annotated[str, Field(description="(可选)保存目录，默认为 'Downloads'。")] = "Downloads",
+        headers: Annotated[Optional[Dict[str, str]], Field(description="(可选)额外的请求头。")] = None
+    ) -> dict:
+        """title: 批量下载页面资源
+        description: 直接把图片、视频、附件等资源下载到磁盘，不经过截图或模型转述。自动带上标签页的 cookies、User-Agent 和 Referer，并发下载 (每个主机有并发上限)，失败自动重试、中断后断点续传，内容相同的文件只保存一份。返回每个文件的路径、大小和总吞吐量。
+        """
+        try:
+            directory = self._data_path(directory)
+        except ValueError as e:
+            return {"error": str(e)}
+        tab = self._get_tab(tab_id)
+        if not tab:
+            return {"error": f"Tab '{tab_id}' not found."}
+        targets = list(urls or [])
+        if selector:
+            for ele in tab.eles(selector):
+                link = ele.attr('src') or ele.attr('href')
+                if link:
+                    targets.append(link)
+        targets = [urljoin(tab.url, u) for u in targets]
+        targets = [u for u in dict.fromkeys(targets) if u.startswith(('http://', 'https://'))]
+        if not targets:
+            return {"error": "No downloadable http(s) URLs found."}
+
+        try:
+            cookies = tab.run_cdp('Network.getCookies', urls=targets)['cookies']
+            request_headers = {"User-Agent": tab.run_js('return navigator.userAgent'), "Referer": tab.url}
+        except Exception as e:
+            return {"error": f"Failed to read cookies/headers from tab: {e}"}
+        request_headers.update(headers or {})
+
+        if directory not in self.downloaders:
+            self.downloaders[directory] = ResourceDownloader(directory)
+        return self.downloaders[directory].download(targets, headers=request_headers, cookies=cookies)
+
     def wait(
         self, 
         seconds: Annotated[Union[int, float], Field(description="需要等待的秒数。")]
@@ -390,37 +825,364 @@ class DrissionPageMCP:
         if kwargs.get('method') == 'Network.responseReceived':
             self.network_events.append(kwargs)
 
+    def _open_archive(self, archive_dir: str, read_only: bool = False, **kwargs) -> TrafficArchive:
+        """
+        内部辅助函数，按目录复用已打开的抓包归档，archive_dir 需已经过 _data_path 解析。
+        查询类工具以只读方式打开；之后需要写入时替换为可写实例，已有的可写实例也可直接用于查询。
+        """
+        archive = self.traffic_archives.get(archive_dir)
+        if archive is None or (archive.read_only and not read_only):
+            if archive is not None:
+                archive.close()
+            archive = self.traffic_archives[archive_dir] = TrafficArchive(archive_dir, read_only=read_only, **kwargs)
+        return archive
+
+    def _stop_streaming(self, tab: ChromiumTab) -> Optional[TrafficArchive]:
+        """内部辅助函数，停止该标签页的归档写入线程并等待其退出，返回它写入的归档。"""
+        if tab.tab_id not in self._streaming:
+            return None
+        archive, thread, stop = self._streaming.pop(tab.tab_id)
+        stop.set()
+        thread.join(timeout=5)
+        return archive
+
+    def _stream_packets(self, tab: ChromiumTab, archive: TrafficArchive, stop: threading.Event):
+        """内部函数：后台线程，持续把监听到的数据包写入归档。"""
+        while not stop.is_set():
+            for packet in tab.listen.steps(timeout=1):
+                try:
+                    archive.add(packet)
+                except Exception as e:
+                    print(f"[!] Warning: Failed to archive packet {packet.url}: {e}", file=sys.stderr)
+                if stop.is_set():
+                    break
+
     def start_network_listening(
         self, 
-        tab_id: Annotated[str, Field(description="要开启监听的目标标签页ID, 可传入 'current'。")] = "current"
+        tab_id: Annotated[str, Field(description="要开启监听的目标标签页ID, 可传入 'current'。")] = "current",
+        persist_dir: Annotated[Optional[str], Field(description="(可选)抓包归档目录。提供后每个请求/响应都会实时写入磁盘 (压缩的 HAR 记录 + 索引)，适合长时间、大量抓包。")] = None,
+        body_cap_kb: Annotated[int, Field(description="(可选)持久化时单个响应体保存的上限(KB)，默认为 256。")] = 256,
+        segment_mb: Annotated[int, Field(description="(可选)持久化时单个段文件的大小上限(MB)，超出后轮转，默认为 64。")] = 64,
+        max_segments: Annotated[int, Field(description="(可选)最多保留的段文件数量，0 表示不限制。")] = 0
     ) -> dict:
         """title: 开启网络监听 (数据分析第1步)
         description: 对指定标签页开启网络流量监听。在需要捕获API请求（如XHR）来获取数据时，首先调用此工具。
         """
+        try:
+            persist_dir = self._data_path(persist_dir) if persist_dir else None
+        except ValueError as e:
+            return {"error": str(e)}
         tab = self._get_tab(tab_id)
         if not tab:
             return {"error": f"Tab '{tab_id}' not found."}
-        tab.listen.start(targets='api')
-        return {'success': f"start listening in {tab_id}"}
+        # 同一标签页重复开启时先停掉旧的写入线程，否则两个线程会争抢 listen.steps，各自只拿到一部分数据包
+        self._stop_streaming(tab)
+        # 持久化归档要保留完整流量 (文档、脚本、图片等), 不只是接口请求
+        tab.listen.start(targets=True if persist_dir else 'api')
+        if not persist_dir:
+            return {'success': f"start listening in {tab_id}"}
+
+        archive = self._open_archive(persist_dir, body_cap=body_cap_kb * 1024,
+                                     max_segment_bytes=segment_mb * 1024 * 1024, max_segments=max_segments)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._stream_packets, args=(tab, archive, stop), daemon=True)
+        thread.start()
+        self._streaming[tab.tab_id] = (archive, thread, stop)
+        return {'success': f"start listening in {tab_id}", "archive_dir": archive.directory}
+
+    def enable_response_cache(
+        self,
+        cache_dir: Annotated[str, Field(description="(可选)缓存目录，重启后仍可复用，默认为 'Web_cache'。")] = "Web_cache",
+        max_mb: Annotated[int, Field(description="(可选)缓存容量上限(MB)，超出后按最近最少使用淘汰，默认为 256。")] = 256,
+        default_ttl: Annotated[int, Field(description="(可选)静态资源 (样式、脚本、图片、媒体、字体) 未声明缓存时间时的默认有效期(秒)，默认为 3600；页面和接口响应未声明时不缓存。")] = 3600,
+        ttl_overrides: Annotated[Optional[Dict[str, int]], Field(description="(可选)按主机名覆盖有效期(秒)，支持通配符，例如 {'api.bilibili.com': 600, '*.hdslb.com': 86400}；对匹配主机的所有响应生效 (带 Set-Cookie 或 no-store/no-cache/private 的响应除外)。")] = None
+    ) -> dict:
+        """title: 开启持久化响应缓存
+        description: 为浏览器所有标签页开启磁盘上的 HTTP 响应缓存，重复访问同一页面或接口时直接由缓存应答，减少网络往返。与 --record 录制模式不能同时使用。
+        """
+        if not self.browser:
+            return {"error": "浏览器未初始化，请先调用 connect_or_open_browser。"}
+        # 每个标签页只能有一个 Fetch.requestPaused 回调，挂上缓存会替换录制/回放的拦截
+        if not self.response_cache and any(getattr(getattr(hook, '__self__', None), 'uses_fetch', False)
+                                           for hook in self.tab_hooks):
+            return {"error": "另一个 Fetch 拦截 (录制或回放) 已在使用，不能同时开启响应缓存。"}
+        if not self.response_cache:
+            try:
+                cache_dir = self._data_path(cache_dir)
+            except ValueError as e:
+                return {"error": str(e)}
+            self.response_cache = ResponseCache(cache_dir, max_bytes=max_mb * 1024 * 1024,
+                                                default_ttl=default_ttl, ttl_overrides=ttl_overrides)
+            self.tab_hooks.append(self.response_cache.attach)
+            # 已经打开的标签页需要立即挂上拦截
+            for tab in self._visible_tabs():
+                self._prepared_tabs.discard(tab.tab_id)
+                self._prepare_tab(tab)
+        return {"status": "success", "cache": self.response_cache.summary()}
+
+    def get_response_cache_stats(self) -> dict:
+        """title: 查看响应缓存统计
+        description: 返回响应缓存的命中、未命中、写入、淘汰次数，节省的字节数以及当前占用。
+        """
+        if not self.response_cache:
+            return {"error": "响应缓存未开启，请先调用 enable_response_cache。"}
+        return self.response_cache.summary()
 
     def get_captured_requests(
         self,
-        tab_id: Annotated[str, Field(description="目标标签页的ID, 可传入 'current'。")] = "current"
+        tab_id: Annotated[str, Field(description="目标标签页的ID, 可传入 'current'。")] = "current",
+        group: Annotated[bool, Field(description="(可选)是否按 方法+URL模板 合并相似请求 (数字/UUID 路径段和时间戳等参数视为相同)，默认为 True；为 False 时逐条返回。")] = True
     ) -> dict:
         """title: 获取抓取到的网络请求 (数据分析第2步)
-        description: 一次性获取所有已捕获的API请求信息，包括URL、状态和JSON响应体。
+        description: 一次性获取所有已捕获的API请求信息。默认按端点分组，每组给出请求数、状态码分布、耗时百分位和合并后的JSON响应结构；轮询、翻页产生的大量相似请求只输出一条。
         """
         tab = self._get_tab(tab_id)
         if not tab:
             return {"error": f"Tab '{tab_id}' not found."}
+        if tab.tab_id in self._streaming:
+            # 持久化模式：停止写入，只返回索引中的前若干条，其余通过 query_captured_requests 查询
+            archive = self._stop_streaming(tab)
+            tab.listen.stop()
+            return {
+                "archive_dir": archive.directory,
+                "total": archive.count(),
+                "captured_requests": archive.query(limit=50),
+            }
         packets_info = []
         # 使用 tab.listen.steps() 遍历所有抓到的包
         for packet in tab.listen.steps(timeout=2):
             packets_info.append(packet)
-        summarized_info = self.summarizer.summarize_packets(packets_info)
+        if group:
+            summarized_info = self.summarizer.summarize_groups(packets_info)
+        else:
+            summarized_info = self.summarizer.summarize_packets(packets_info)
         # 抓取完后自动停止监听，保持干净
         tab.listen.stop()
-        return {"captured_requests": summarized_info}
+        return {"total_requests": len(packets_info), "captured_requests": summarized_info}
+
+    def query_captured_requests(
+        self,
+        archive_dir: Annotated[str, Field(description="start_network_listening 时指定的抓包归档目录。")],
+        url_contains: Annotated[Optional[str], Field(description="(可选)URL 包含的子串。")] = None,
+        status: Annotated[Optional[int], Field(description="(可选)HTTP 状态码。")] = None,
+        mime_contains: Annotated[Optional[str], Field(description="(可选)MIME 类型包含的子串，例如 'json'。")] = None,
+        limit: Annotated[int, Field(description="(可选)最多返回条数，默认为 50。")] = 50,
+        offset: Annotated[int, Field(description="(可选)跳过的条数，用于翻页。")] = 0
+    ) -> dict:
+        """title: 查询已归档的网络请求
+        description: 在磁盘抓包归档的索引中按 URL、状态码、MIME 筛选请求，返回请求ID列表 (不含响应体)。
+        """
+        try:
+            archive_dir = self._data_path(archive_dir)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not os.path.exists(os.path.join(archive_dir, 'index.db')):
+            return {"error": f"Archive '{archive_dir}' not found."}
+        archive = self._open_archive(archive_dir, read_only=True)
+        return {"total": archive.count(),
+                "requests": archive.query(url_contains, status, mime_contains, limit=limit, offset=offset)}
+
+    def get_captured_body(
+        self,
+        archive_dir: Annotated[str, Field(description="抓包归档目录。")],
+        packet_id: Annotated[int, Field(description="query_captured_requests 返回的请求ID。")],
+        summarize: Annotated[bool, Field(description="(可选)JSON 响应是否只返回结构摘要，默认为 True。")] = True
+    ) -> dict:
+        """title: 读取已归档请求的详情
+        description: 根据请求ID直接从磁盘归档中读取该请求的请求头、响应头、耗时和响应体。
+        """
+        try:
+            archive_dir = self._data_path(archive_dir)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not os.path.exists(os.path.join(archive_dir, 'index.db')):
+            return {"error": f"Archive '{archive_dir}' not found."}
+        entry = self._open_archive(archive_dir, read_only=True).get_entry(packet_id)
+        if not entry:
+            return {"error": f"Packet '{packet_id}' not found."}
+        content = entry["response"]["content"]
+        if summarize and "json" in content.get("mimeType", "") and not content.get("truncated"):
+            try:
+                content["text"] = self.summarizer._summarize_json_recursively(json.loads(content["text"]))
+            except ValueError:
+                pass
+        return entry
+
+    def export_har(
+        self,
+        archive_dir: Annotated[str, Field(description="抓包归档目录。")],
+        packet_ids: Annotated[List[int], Field(description="要导出的请求ID列表。")],
+        path: Annotated[str, Field(description="导出的 .har 文件路径。")]
+    ) -> dict:
+        """title: 导出 HAR 文件
+        description: 把归档中指定的请求导出为标准 HAR 文件，可在浏览器开发者工具中导入查看。
+        """
+        try:
+            archive_dir = self._data_path(archive_dir)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not os.path.exists(os.path.join(archive_dir, 'index.db')):
+            return {"error": f"Archive '{archive_dir}' not found."}
+        try:
+            path = self._data_path(path)
+        except ValueError as e:
+            return {"error": str(e)}
+        exported = self._open_archive(archive_dir, read_only=True).export_har(path, packet_ids)
+        return {"exported": exported, "path": path}
+
+    def _origin_context(self, origin: str) -> ChromiumTab:
+        """
+        内部辅助函数，打开一个属于指定 origin 的临时后台标签页。
+        页面由 Fetch 拦截直接返回空白文档，不访问网络，用于读写该 origin 的 localStorage / IndexedDB。
+        """
+        tab = self.browser.new_tab(background=True)
+        blank_url = f"{origin}/__dp_state__"
+
+        def fulfill(**kwargs):
+            tab.run_cdp('Fetch.fulfillRequest', requestId=kwargs['requestId'], responseCode=200,
+                        responseHeaders=[{'name': 'Content-Type', 'value': 'text/html'}],
+                        body=base64.b64encode(b'<html></html>').decode('ascii'))
+
+        tab.driver.set_callback('Fetch.requestPaused', fulfill)
+        tab.run_cdp('Fetch.enable', patterns=[{'urlPattern': blank_url}])
+        tab.get(blank_url)
+        return tab
+
+    def save_session_state(
+        self,
+        name: Annotated[str, Field(description="存档名称，例如 'github'。")],
+        origins: Annotated[Optional[List[str]], Field(description="(可选)要保存的站点列表，例如 ['https://github.com']；默认为当前页面所在站点。")] = None,
+        tab_id: Annotated[str, Field(description="已登录的标签页ID, 可传入 'current'。sessionStorage 只能从该标签页读取。")] = "current"
+    ) -> dict:
+        """title: 保存登录状态
+        description: 把指定站点的 cookies、localStorage、sessionStorage 和 IndexedDB 保存为命名存档。下次用 restore_session_state 恢复即可跳过登录流程。
+        """
+        tab = self._get_tab(tab_id)
+        if not tab:
+            return {"error": f"Tab '{tab_id}' not found."}
+        current_origin = normalize_origin(tab.url)
+        origins = [normalize_origin(o) for o in (origins or [current_origin])]
+
+        try:
+            cookies = tab.run_cdp('Network.getCookies', urls=[f"{o}/" for o in origins])['cookies']
+            states = {}
+            for origin in origins:
+                if origin == current_origin:
+                    states[origin] = json.loads(tab.run_js(storageSnapshot))
+                else:
+                    temp = self._origin_context(origin)
+                    try:
+                        states[origin] = json.loads(temp.run_js(storageSnapshot))
+                    finally:
+                        temp.close()
+        except Exception as e:
+            return {"error": f"Failed to snapshot session state: {e}"}
+
+        profile = self.session_store.save(name, cookies, states)
+        return {
+            "status": "success",
+            "name": name,
+            "cookies": len(profile["cookies"]),
+            "origins": {o: {"localStorage": len(st["localStorage"]), "sessionStorage": len(st["sessionStorage"]),
+                            "indexedDB": [db["name"] for db in st["indexedDB"]]} for o, st in states.items()},
+            "expires_at": profile["expires_at"],
+        }
+
+    def restore_session_state(
+        self,
+        name: Annotated[str, Field(description="save_session_state 保存的存档名称。")],
+        tab_id: Annotated[str, Field(description="要恢复到的标签页ID, 可传入 'current'。建议在导航到目标网站之前调用。")] = "current"
+    ) -> dict:
+        """title: 恢复登录状态
+        description: 把命名存档中的 cookies、localStorage、IndexedDB 写回浏览器，sessionStorage 会在该标签页下次打开对应站点时自动写入。恢复后直接导航到目标网站即可保持登录。
+        """
+        profile = self.session_store.load(name)
+        if not profile:
+            return {"error": f"Session profile '{name}' not found."}
+        tab = self._get_tab(tab_id)
+        if not tab:
+            return {"error": f"Tab '{tab_id}' not found."}
+
+        start = time.perf_counter()
+        cookies = self.session_store.live_cookies(profile)
+        current_origin = normalize_origin(tab.url) if tab.url.startswith('http') else None
+        try:
+            if cookies:
+                tab.run_cdp('Network.setCookies', cookies=cookies)
+            idb_records = 0
+            for origin, state in profile["origins"].items():
+                if state["localStorage"] or state["indexedDB"]:
+                    if origin == current_origin:
+                        idb_records += tab.run_js(storageRestore, json.dumps(state))
+                    else:
+                        temp = self._origin_context(origin)
+                        try:
+                            idb_records += temp.run_js(storageRestore, json.dumps(state))
+                        finally:
+                            temp.close()
+                if state["sessionStorage"]:
+                    # sessionStorage 属于标签页，只能在该标签页加载对应站点时、页面脚本运行之前写入
+                    # 标记只用来防止脚本移除前页面刷新时重复写入, 生效后由 _finish_session_restore 连同脚本一起清除
+                    pending = self._session_restores.setdefault(tab.tab_id, {})
+                    if origin in pending:
+                        tab.run_cdp('Page.removeScriptToEvaluateOnNewDocument', identifier=pending.pop(origin)[0])
+                    items = json.dumps(state["sessionStorage"])
+                    marker = f"__dp_restore_{uuid.uuid4().hex[:8]}"
+                    identifier = tab.run_cdp('Page.addScriptToEvaluateOnNewDocument', source=(
+                        f"if (location.origin === {json.dumps(origin)} && sessionStorage.getItem({json.dumps(marker)}) === null) {{"
+                        f" Object.entries({items}).forEach(([k, v]) => sessionStorage.setItem(k, v));"
+                        f" sessionStorage.setItem({json.dumps(marker)}, '1'); }}"))['identifier']
+                    pending[origin] = (identifier, marker)
+        except Exception as e:
+            return {"error": f"Failed to restore session state: {e}"}
+
+        return {
+            "status": "success",
+            "restored_cookies": len(cookies),
+            "skipped_expired_cookies": len(profile["cookies"]) - len(cookies),
+            "indexedDB_records": idb_records,
+            "origins": list(profile["origins"]),
+            "profile_expired": bool(profile["expires_at"] and profile["expires_at"] <= time.time()),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+        }
+
+    def list_session_states(self) -> List[Dict[str, Any]]:
+        """title: 列出已保存的登录状态
+        description: 列出所有登录状态存档及其包含的站点、保存时间和过期情况。
+        """
+        return self.session_store.list()
+
+    def start_watchdog(
+        self,
+        interval: Annotated[float, Field(description="(可选)检查间隔(秒)，默认为 15。")] = 15,
+        max_tab_heap_mb: Annotated[float, Field(description="(可选)单个标签页 JS 堆上限(MB)，默认为 512。")] = 512,
+        max_total_rss_mb: Annotated[float, Field(description="(可选)浏览器所有进程内存总和上限(MB)，默认为 4096。")] = 4096,
+        idle_seconds: Annotated[float, Field(description="(可选)标签页空闲多久后才允许被休眠(秒)，默认为 300。")] = 300
+    ) -> dict:
+        """title: 开启内存看门狗
+        description: 在后台定期检查各标签页的 JS 堆和浏览器进程内存，超限时把最久未使用的空闲标签页休眠 (保留标签页ID和URL，下次使用时自动恢复)，浏览器崩溃时自动重连。适合长时间运行的任务。
+        """
+        if not self.browser:
+            return {"error": "浏览器未初始化，请先调用 connect_or_open_browser。"}
+        if self.watchdog:
+            self.watchdog.stop()
+        self.watchdog = MemoryWatchdog(self, interval=interval, max_tab_heap_mb=max_tab_heap_mb,
+                                       max_total_rss_mb=max_total_rss_mb, idle_seconds=idle_seconds)
+        self.watchdog.start()
+        return {"status": "success", **self.watchdog.status()}
+
+    def get_watchdog_status(
+        self,
+        stop: Annotated[bool, Field(description="(可选)是否同时停止看门狗，默认为 False。")] = False
+    ) -> dict:
+        """title: 查看内存看门狗状态
+        description: 返回最近一次的内存采样、当前休眠的标签页以及休眠、恢复、重连等事件记录。
+        """
+        if not self.watchdog:
+            return {"error": "看门狗未开启，请先调用 start_watchdog。"}
+        if stop:
+            self.watchdog.stop()
+        return self.watchdog.status()
 
     def count(
         self,
@@ -430,10 +1192,33 @@ class DrissionPageMCP:
         """title: 统计子字符串出现次数
         description: 统计一个目标字符串（target）在另一个文本文件中出现的次数。
         """
-        with open(path, 'r', encoding='utf-8') as f:
+        with open(self._data_path(path), 'r', encoding='utf-8') as f:
             text = f.read()
         return text.count(target)
 
+    def search_pages(
+        self,
+        query: Annotated[str, Field(description="要检索的文本。")],
+        mode: Annotated[Literal['phrase', 'prefix', 'fts'], Field(description="(可选)匹配方式: 'phrase' 精确子串匹配 (默认), 'prefix' 以 query 开头的英文单词, 'fts' 原始 FTS5 查询表达式 (支持 AND / OR / NOT 和 \"短语\", 每个词至少 3 个字符)。")] = 'phrase',
+        site: Annotated[Optional[str], Field(description="(可选)只检索 URL 包含该字符串的页面, 例如域名。")] = None,
+        limit: Annotated[int, Field(description="(可选)最多返回的页面数, 按出现次数降序, 默认 10。")] = 10,
+    ) -> dict:
+        """title: 全文检索已提取的页面
+        description: 在 get_visible_text 提取过的所有页面正文中检索, 返回命中页面数、总出现次数, 以及每个页面的出现次数和上下文片段。
+        适合 "这个网站上某个词出现了多少次" 这类问题, 无需重新打开页面或读取文件。同一 URL 只保留最近一次提取的内容。
+        """
+        if self.page_index is None:
+            db_path = os.path.join(self._data_path('Web_info'), 'pages.db')
+            if not os.path.exists(db_path):
+                return {"error": "No pages indexed yet. Call get_visible_text first."}
+            self.page_index = PageIndex(db_path)
+        try:
+            result = self.page_index.search(query, mode=mode, site=site, limit=limit)
+        except Exception as e:
+            return {"error": f"Search failed: {e}"}
+        result["indexed_pages"] = self.page_index.stats()["pages"]
+        return result
+
 
     def get_visible_text(
         self, 
@@ -443,7 +1228,7 @@ class DrissionPageMCP:
         """title: 获取页面可见正文并保存
         description: 提取、返回并保存当前页面上所有可见的、有意义的文本。会自动过滤掉导航、按钮等无意义的短文本。
         """
-        output_dir = "Web_info"
+        output_dir = self._data_path("Web_info")
         tab = self._get_tab(tab_id)
         if not tab:
             return {"error": f"Tab '{tab_id}' not found."}
@@ -481,6 +1266,11 @@ class DrissionPageMCP:
             with open(file_path, 'w', encoding='utf-8') as f:
                 f.write(final_text)
 
+            # 同时写入全文索引，之后用 search_pages 检索，不必重新读取页面或文件
+            if self.page_index is None:
+                self.page_index = PageIndex(os.path.join(output_dir, 'pages.db'))
+            self.page_index.add(tab.url, page_title, final_text)
+
             # 4. 在返回值中同时包含文本内容和文件路径
             return {
                 "visible_text": final_text,
@@ -490,10 +1280,57 @@ class DrissionPageMCP:
         except Exception as e:
             return {"error": f"Failed to get and save visible text: {e}"}
 
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
 def main():
+    parser = argparse.ArgumentParser(description="DrissionPage MCP server")
+    parser.add_argument('--record', metavar='ARCHIVE_DIR', help="录制工具调用及其网络流量到指定目录, 供 SessionRecorder.py 离线回放")
+    parser.add_argument('--transport', choices=['stdio', 'streamable-http', 'sse'], default='stdio',
+                        help="传输方式; HTTP/SSE 模式下多个客户端共享一个常驻浏览器, 每个会话相互隔离")
+    parser.add_argument('--host', default='127.0.0.1', help="HTTP/SSE 模式的监听地址")
+    parser.add_argument('--port', type=int, default=8000, help="HTTP/SSE 模式的监听端口")
+    parser.add_argument('--max-sessions', type=int, default=8, help="HTTP/SSE 模式下同时存在的最大会话数, 超出时拒绝新会话")
+    parser.add_argument('--idle-timeout', type=float, default=1800, help="会话空闲多少秒后可被回收")
+    parser.add_argument('--debug-port', type=int, default=9222, help="共享浏览器的调试端口")
+    parser.add_argument('--headless', action='store_true', help="共享浏览器以无头模式启动")
+    parser.add_argument('--data-dir', default='Sessions', help="HTTP/SSE 模式下各会话落盘数据的根目录, 每个会话使用其中独立的子目录")
+    parser.add_argument('--allow-remote', action='store_true',
+                        help="允许 HTTP/SSE 模式监听非本机地址; 服务没有鉴权, 任何能访问该端口的客户端都可以操作浏览器")
+    args = parser.parse_args()
+    shared = args.transport != 'stdio'
+    if shared and args.record:
+        parser.error("--record 只支持 stdio 传输")
+    if shared and not args.allow_remote and not _is_loopback(args.host):
+        parser.error(f"--host {args.host} 不是本机地址; 服务没有鉴权, 确需对外监听请加 --allow-remote")
+
     # --- MCP Server Initialization ---
-    mcp = FastMCP("DrissionPageMCP", log_level="ERROR", instructions=prompt)
+    mcp = FastMCP("DrissionPageMCP", log_level="ERROR", instructions=prompt, host=args.host, port=args.port)
     b = DrissionPageMCP()
+    recorder = None
+    pool = None
+    if args.record:
+        recorder = SessionRecorder(args.record)
+        b.tab_hooks.append(recorder.traffic.attach)
+    if shared:
+        # 预热一个浏览器，所有会话共用；b 仅作为注册工具时的签名模板
+        browser_config = {'debug_port': args.debug_port, 'headless': args.headless}
+
+        def make_agent() -> DrissionPageMCP:
+            # 每个会话的落盘数据放在独立子目录, 会话之间不能检索、恢复或导出彼此的数据
+            agent = DrissionPageMCP(browser=pool.browser, isolated=True,
+                                    data_root=os.path.join(args.data_dir, uuid.uuid4().hex))
+            agent.reconnect_handler = pool.reconnect
+            return agent
+
+        pool = SessionPool(make_agent, max_sessions=args.max_sessions, idle_timeout=args.idle_timeout,
+                           browser_factory=lambda: DrissionPageMCP._create_browser(browser_config))
     # --- 智能注册工具的循环 ---
     for name, method in inspect.getmembers(b, predicate=inspect.ismethod):
         if not name.startswith('_'):
@@ -517,14 +1354,18 @@ def main():
                 tool_annotations['title'] = title
 
             description = description.replace('description: ','')
-            # Call add_tool with the correct parameters
+            # 返回值统一经过整形层, 按预算截断并给出续读游标
+            fn = pool.dispatcher(name, method) if pool else b.shaper.wrap(method)
+            # 录制整形后的返回值 (即客户端实际看到的内容)，其中的续读游标回放时才能对应上
+            if recorder:
+                fn = recorder.wrap(name, fn)
             mcp.add_tool(
-                fn=method, 
+                fn=fn, 
                 name=name, 
                 description=description, 
             )
-    print("DrissionPage MCP server (Ultimate Scanner) is running...")
-    mcp.run(transport='stdio')
+    print("DrissionPage MCP server (Ultimate Scanner) is running...", file=sys.stderr)
+    mcp.run(transport=args.transport)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
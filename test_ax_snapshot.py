@@ -0,0 +1,54 @@
+import asyncio
+import json
+import time
+from main import DrissionPageMCP
+from ToolBox import serve_directory
+
+FIXTURES = ["publications.html"]
+ROUNDS = 5
+
+
+def measure(fn, rounds=ROUNDS):
+    """多次调用取平均耗时 (毫秒)，返回 (最后一次结果, 平均耗时)。"""
+    result, start = None, time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return result, (time.perf_counter() - start) * 1000 / rounds
+
+
+async def run_ax_snapshot_benchmark():
+    """
+    在本地 fixtures 页面上对比 `get_ax_snapshot` 与 `get_domTreeToJson` 的节点数、字节数和耗时，
+    并验证快照中的 element_id 可以直接用于 click。
+    """
+    print("--- 测试开始：无障碍树快照 vs DOM JSON ---")
+    server, base_url = serve_directory('fixtures')
+    agent = DrissionPageMCP()
+    await agent.connect_or_open_browser({'debug_port': 9222, 'headless': True})
+
+    print(f"\n{'fixture':<24}{'repr':<14}{'nodes':>8}{'bytes':>10}{'ms':>10}")
+    for name in FIXTURES:
+        await agent.get(url=f"{base_url}/{name}")
+
+        dom_json, dom_ms = measure(lambda: agent.get_domTreeToJson(output_format='json'))
+        dom_nodes = dom_json.count('":')
+        print(f"{name:<24}{'dom json':<14}{dom_nodes:>8}{len(dom_json.encode()):>10}{dom_ms:>10.1f}")
+
+        outline, outline_ms = measure(lambda: agent.get_domTreeToJson(output_format='outline'))
+        print(f"{name:<24}{'dom outline':<14}{outline.count(chr(10)) + 1:>8}{len(outline.encode()):>10}{outline_ms:>10.1f}")
+
+        snapshot, ax_ms = measure(lambda: agent.get_ax_snapshot())
+        ax_bytes = len(json.dumps(snapshot, ensure_ascii=False).encode())
+        print(f"{name:<24}{'ax snapshot':<14}{snapshot['emitted_nodes']:>8}{ax_bytes:>10}{ax_ms:>10.1f}")
+
+    # 快照中的 id 直接可用
+    button_id = next(line.split(']')[0].strip(' [') for line in snapshot['snapshot'].splitlines()
+                     if 'button "Menu"' in line)
+    print(f"\n[+] 点击快照中的按钮 {button_id}: {agent.click(element_id=button_id)}")
+
+    agent.browser.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_ax_snapshot_benchmark())
@@ -0,0 +1,57 @@
+import asyncio
+import os
+import shutil
+import tempfile
+from email.utils import formatdate
+from main import DrissionPageMCP
+from ToolBox import serve_directory
+
+
+async def run_download_test():
+    """
+    在本地 fixtures 站点上验证 download_resources: 按选择器收集链接、内容去重, 以及中断后的断点续传。
+    """
+    print("--- 测试开始：批量下载页面资源 ---")
+    server, base_url = serve_directory('fixtures')
+    directory = tempfile.mkdtemp(prefix='dp_download_')
+    agent = DrissionPageMCP()
+    await agent.connect_or_open_browser({'debug_port': 9222, 'headless': True})
+    # 目录列表页中的每个 <a> 指向一个 fixture 文件
+    await agent.get(url=f"{base_url}/")
+
+    result = agent.download_resources(selector='tag:a', directory=directory)
+    print(f"[selector]  下载 {result['downloaded']} 个, {result['bytes_transferred']} 字节, {result['throughput_mb_s']} MB/s")
+    assert result['failed'] == 0 and result['downloaded'] >= 2
+
+    # 相同内容换一个 URL 再下载, 只应记为重复
+    result = agent.download_resources(urls=['publications.html?copy=1'], directory=directory)
+    print(f"[dedup]     {result['files'][0]['status']} -> {result['files'][0]['path']}")
+    assert result['duplicates'] == 1
+
+    # 预先写入一半内容和当时的 Last-Modified, 模拟中断后续传
+    downloader = agent.downloaders[os.path.abspath(directory)]
+    url = f"{base_url}/form50.html?resume=1"
+    fixture = os.path.join('fixtures', 'form50.html')
+    with open(fixture, 'rb') as f:
+        data = f.read()
+    last_modified = formatdate(int(os.path.getmtime(fixture)), usegmt=True)
+    part = downloader._part_path(url)
+    for validator in (last_modified, 'Thu, 01 Jan 1970 00:00:00 GMT'):
+        with open(part, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        with open(part + '.meta', 'w', encoding='utf-8') as f:
+            f.write(validator)
+        result = agent.download_resources(urls=[url], directory=directory)
+        file = result['files'][0]
+        print(f"[resume]    If-Range={validator}: 从 {file['resumed_from']} 字节续传, 本次传输 {result['bytes_transferred']} / {len(data)} 字节")
+        assert file['bytes'] == len(data) and not os.path.exists(part + '.meta')
+        # 校验器与服务器不一致 (文件已变化) 时不能拼接, 必须从头下载
+        assert file['resumed_from'] == (len(data) // 2 if validator == last_modified else 0)
+
+    agent.browser.quit()
+    server.shutdown()
+    shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    asyncio.run(run_download_test())
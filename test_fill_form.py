@@ -0,0 +1,61 @@
+import asyncio
+import time
+from main import DrissionPageMCP
+from ToolBox import serve_directory
+
+FIELD_COUNT = 50
+
+
+def field_value(i):
+    """与 fixtures/form50.html 中字段类型对应的测试值。"""
+    kind = i % 10
+    if kind == 8:
+        return "b"
+    if kind == 9:
+        return True
+    if kind == 1:
+        return f"user{i}@example.com"
+    if kind in (3, 5):
+        return str(1000 + i)
+    return f"value for field {i} " * 3
+
+
+async def run_fill_form_benchmark():
+    """
+    在本地 50 字段表单上对比逐个 `input_text` 与一次 `fill_form` 的单字段耗时。
+    """
+    print("--- 测试开始：批量填表 vs 逐个输入 ---")
+    server, base_url = serve_directory('fixtures')
+    agent = DrissionPageMCP()
+    await agent.connect_or_open_browser({'debug_port': 9222, 'headless': True})
+    url = f"{base_url}/form50.html"
+
+    # --- 现有路径：每个字段 find_element + input_text ---
+    await agent.get(url=url)
+    text_fields = [i for i in range(FIELD_COUNT) if i % 10 not in (8, 9)]
+    start = time.perf_counter()
+    verified = 0
+    for i in text_fields:
+        element_id = agent.find_element(tab_id='current', by='css', value=f'#f{i}')['element_id']
+        result = agent.input_text(element_id=element_id, text=field_value(i))
+        verified += result['feedback']['verified']
+    per_field = (time.perf_counter() - start) * 1000 / len(text_fields)
+    print(f"[input_text] {len(text_fields)} 个文本字段, 校验通过 {verified}, 平均 {per_field:.1f} ms/字段")
+
+    # --- 新路径：一次 fill_form ---
+    await agent.get(url=url)
+    fields = {f'#f{i}': field_value(i) for i in range(FIELD_COUNT)}
+    start = time.perf_counter()
+    result = agent.fill_form(fields=fields)
+    per_field = (time.perf_counter() - start) * 1000 / FIELD_COUNT
+    verified = sum(f['verified'] for f in result['fields'].values())
+    methods = {f.get('method') for f in result['fields'].values()}
+    print(f"[fill_form]  {FIELD_COUNT} 个字段, 校验通过 {verified}, 平均 {per_field:.1f} ms/字段 (含定位), 方式 {methods}")
+    print(f"  页面收到 change 事件: {agent.run_javascript(tab_id='current', js_script='return window.changeCount')}")
+
+    agent.browser.quit()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_fill_form_benchmark())
@@ -41,11 +41,11 @@ async def run_network_capture_test():
         print("  [!] 失败：没有捕获到任何网络请求。")
         return
         
-    print(f"  [+] 成功：捕获到 {len(requests)} 条API请求。")
+    print(f"  [+] 成功：捕获到 {capture_result['total_requests']} 条请求，合并为 {len(requests)} 个端点。")
     for req in requests:
-        if req['json'] is None:
-            continue
-        print(req['json'])
+        print(f"  {req['count']:4d} x {req['method']} {req['url_template']}  {req['status']}")
+        if isinstance(req.get('response_schema'), dict):
+            print(json.dumps(req['response_schema'], ensure_ascii=False)[:300])
         
 if __name__ == "__main__":
     asyncio.run(run_network_capture_test())
\ No newline at end of file
@@ -0,0 +1,41 @@
+import os
+import shutil
+import tempfile
+from PageIndex import PageIndex
+
+
+def run_page_index_test():
+    """
+    不需要浏览器: 直接向 PageIndex 写入几页正文, 验证短语、前缀、FTS 表达式和短查询的计数与片段,
+    包括查询与正文大小写不一致的情况。
+    """
+    print("--- 测试开始：页面全文索引 ---")
+    directory = tempfile.mkdtemp(prefix='dp_index_')
+    index = PageIndex(os.path.join(directory, 'pages.db'))
+    index.add('https://a.example/1', 'Greeting', 'Hello world. The WORLD is wide; hello again, World!')
+    index.add('https://a.example/2', 'Peace', 'Peace and quiet.')
+    index.add('https://b.example/3', '中文', '这是一个中文页面, 包含 hello 一词。')
+
+    cases = [
+        # (查询, 模式, 站点, 期望命中的页面数, 期望的总次数)
+        ('hello world', 'phrase', None, 1, 1),
+        ('WORLD', 'phrase', None, 1, 3),
+        ('wor', 'prefix', None, 1, 3),
+        ('"hello world" OR peace', 'fts', None, 2, 2),
+        ('hello', 'phrase', 'b.example', 1, 1),
+        ('中文', 'phrase', None, 1, 1),
+    ]
+    for query, mode, site, pages, total in cases:
+        result = index.search(query, mode=mode, site=site)
+        print(f"[{mode:6}] {query!r} site={site}: {result['matched_pages']} 页, {result['total_occurrences']} 次")
+        for r in result['results']:
+            print(f"          {r['url']}: {r['snippets'][0]}")
+        assert (result['matched_pages'], result['total_occurrences']) == (pages, total), result
+
+    index._conn.close()
+    shutil.rmtree(directory)
+    print("--- 测试结束 ---")
+
+
+if __name__ == "__main__":
+    run_page_index_test()
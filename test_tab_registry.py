@@ -0,0 +1,51 @@
+import asyncio
+import time
+from main import DrissionPageMCP
+
+TAB_COUNT = 50
+ROUNDS = 20
+
+
+def list_tabs_by_polling(browser):
+    """旧实现：get_tabs() 后逐个标签页读取 title 和 url。"""
+    active = browser.latest_tab
+    return [{"tab_id": t.tab_id, "title": t.title, "url": t.url, "is_active": t == active}
+            for t in browser.get_tabs()]
+
+
+def timed(fn, rounds=ROUNDS):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        result = fn()
+    return result, (time.perf_counter() - start) * 1000 / rounds
+
+
+async def run_tab_registry_benchmark():
+    """
+    打开 50 个标签页，对比逐个查询与基于 Target 事件的元数据表在 list_tabs / 当前标签页 / 数量统计上的耗时。
+    """
+    print(f"--- 测试开始：{TAB_COUNT} 个标签页的枚举耗时 ---")
+    agent = DrissionPageMCP()
+    await agent.connect_or_open_browser({'debug_port': 9222, 'headless': True})
+    for i in range(TAB_COUNT - 1):
+        await agent.new_tab(url=f"data:text/html,<title>tab {i}</title>")
+    time.sleep(1)  # 等待 targetInfoChanged 事件送达
+
+    old, old_ms = timed(lambda: list_tabs_by_polling(agent.browser))
+    new, new_ms = timed(agent.list_tabs)
+    print(f"[list_tabs]  逐个查询 {old_ms:8.2f} ms   元数据表 {new_ms:8.2f} ms   ({len(old)} vs {len(new)} 个)")
+    assert {t['tab_id'] for t in old} == {t['tab_id'] for t in new}
+
+    _, old_ms = timed(lambda: agent.browser.latest_tab)
+    _, new_ms = timed(lambda: agent._get_tab('current'))
+    print(f"[current]    latest_tab {old_ms:8.2f} ms   元数据表 {new_ms:8.2f} ms")
+
+    _, old_ms = timed(lambda: agent.browser.tabs_count)
+    _, new_ms = timed(lambda: len(agent._registry()))
+    print(f"[tab count]  tabs_count {old_ms:8.2f} ms   元数据表 {new_ms:8.2f} ms")
+
+    agent.browser.quit()
+
+
+if __name__ == "__main__":
+    asyncio.run(run_tab_registry_benchmark())